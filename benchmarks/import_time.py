@@ -0,0 +1,85 @@
+"""
+Guard against CLI startup regressions: resolving a single command must not import the LLM SDKs other commands use.
+
+    python benchmarks/import_time.py
+
+Exits non-zero if a forbidden module is imported, or a command which does not need an LLM SDK starts slower than
+`--max-seconds`.
+"""
+
+import argparse
+import json
+import subprocess
+import sys
+import time
+
+# command => modules which must *not* be imported when only that command is loaded
+FORBIDDEN_IMPORTS = {
+    "dependabot": ["openai", "pydantic_ai", "jinja2"],
+    "notifications": ["openai", "pydantic_ai", "jinja2"],
+    "keep-alive-prs": ["pydantic_ai", "jinja2"],
+    "check-releases": ["openai"],
+}
+
+# commands that legitimately load an LLM SDK are only checked for leaked imports, not wall time
+TIMED_COMMANDS = {"dependabot", "notifications"}
+
+PROBE = """
+import json, sys, time
+start = time.perf_counter()
+from github_overlord import cli
+cli.get_command(None, {command!r})
+elapsed = time.perf_counter() - start
+print(json.dumps({{"elapsed": elapsed, "modules": sorted(sys.modules)}}))
+"""
+
+
+def measure(command: str, runs: int) -> tuple[float, set[str]]:
+    timings = []
+    modules: set[str] = set()
+
+    for _ in range(runs):
+        # fresh interpreter each time, otherwise everything is already in sys.modules
+        output = subprocess.run(
+            [sys.executable, "-c", PROBE.format(command=command)],
+            check=True,
+            capture_output=True,
+            text=True,
+        ).stdout
+        result = json.loads(output.strip().splitlines()[-1])
+
+        timings.append(result["elapsed"])
+        modules = set(result["modules"])
+
+    return min(timings), modules
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--runs", type=int, default=3)
+    parser.add_argument("--max-seconds", type=float, default=1.0)
+    args = parser.parse_args()
+
+    failed = False
+
+    for command, forbidden in FORBIDDEN_IMPORTS.items():
+        started = time.perf_counter()
+        elapsed, modules = measure(command, args.runs)
+        leaked = [name for name in forbidden if name in modules]
+
+        status = "ok"
+        if leaked or (command in TIMED_COMMANDS and elapsed > args.max_seconds):
+            status = "FAIL"
+            failed = True
+
+        print(
+            f"{status:4} {command:15} {elapsed * 1000:7.1f}ms"
+            + (f" leaked={','.join(leaked)}" if leaked else "")
+            + f" (benchmark took {time.perf_counter() - started:.1f}s)"
+        )
+
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
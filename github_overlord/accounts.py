@@ -0,0 +1,71 @@
+"""
+Credentials for running against several GitHub accounts/orgs from a single process.
+
+The accounts file is JSON, tokens can be inlined or (preferably) read from an environment variable:
+
+    [
+        {"name": "personal", "token_env": "GITHUB_TOKEN"},
+        {"name": "work", "token_env": "GITHUB_TOKEN_WORK", "workers": 2, "orgs": ["acme"]}
+    ]
+
+Repos are listed for the token's user, and for each org in `orgs` (the token needs access to them).
+"""
+
+import json
+import os
+from dataclasses import dataclass
+from pathlib import Path
+
+# account name used when running with a single GITHUB_TOKEN instead of an accounts file
+DEFAULT_ACCOUNT_NAME = "default"
+
+
+@dataclass(frozen=True)
+class Account:
+    name: str
+    token: str = ""
+    # how many processes may use this token at the same time, every process shares the token's rate limit
+    workers: int = 1
+    # orgs whose repos are processed in addition to the user's own
+    orgs: tuple[str, ...] = ()
+
+    def __repr__(self):
+        # never leak the token into logs or tracebacks
+        return (
+            f"Account(name={self.name!r}, workers={self.workers}, orgs={self.orgs!r})"
+        )
+
+
+def load_accounts(path: str | Path) -> list[Account]:
+    with open(path, encoding="utf-8") as f:
+        entries = json.load(f)
+
+    assert isinstance(entries, list), "accounts file must contain a JSON list"
+
+    accounts = []
+
+    for entry in entries:
+        token = entry.get("token") or os.getenv(entry.get("token_env", ""), "")
+        assert token, f"no token for account {entry.get('name')}"
+
+        accounts.append(
+            Account(
+                name=entry.get("name") or entry.get("token_env"),
+                token=token,
+                workers=int(entry.get("workers", 1)),
+                orgs=tuple(entry.get("orgs", ())),
+            )
+        )
+
+    names = [account.name for account in accounts]
+    assert len(names) == len(set(names)), "account names must be unique"
+
+    return accounts
+
+
+def resolve_accounts(accounts_file: str | None, token: str | None) -> list[Account]:
+    if accounts_file:
+        return load_accounts(accounts_file)
+
+    assert token, "GitHub token is required"
+    return [Account(name=DEFAULT_ACCOUNT_NAME, token=token)]
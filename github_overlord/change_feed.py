@@ -0,0 +1,304 @@
+"""
+Change detection from the events API, so a cycle only does per-repo work for repos with activity.
+
+The user's own and received events feeds (plus, for repos outside of those, the repo events feed) are polled with
+`If-None-Match`. An unchanged feed is answered with a `304`, which does not count against the rate limit. New events
+update a local index of repo => time of the last relevant event, and every command keeps a cursor of when it last
+consumed the index: the repos changed since then are the only ones it processes.
+
+Handing a repo out is not the same as processing it: shards and queue workers run long after the listing, and a repo
+can crash or be deferred by its deadline. Every repo handed out stays pending for the command until it is reported as
+processed (`mark_processed`, or the run journal marking it completed), pending repos are part of the next changed set.
+
+The events API has no check run or status events. Repos stay in the changed set for `GITHUB_OVERLORD_CHANGE_GRACE`
+seconds after their last event, so CI which finishes after a PR was opened or pushed to is still picked up.
+"""
+
+import time
+import typing as t
+from datetime import datetime
+
+from decouple import config
+from github import Github
+from github.Repository import Repository
+from github.Requester import Requester
+
+from . import checkpoint
+from .pagination import parse_link_header
+from .state import read_state, state_path, update_state
+from .utils import log
+
+CHANGE_GRACE_SECONDS = t.cast(
+    int, config("GITHUB_OVERLORD_CHANGE_GRACE", default=6 * 60 * 60, cast=int)
+)
+
+# new PRs, pushes and comments, everything else does not create work for any command
+RELEVANT_EVENT_TYPES = {
+    "PullRequestEvent",
+    "PullRequestReviewEvent",
+    "PullRequestReviewCommentEvent",
+    "IssueCommentEvent",
+    "PushEvent",
+    "CreateEvent",
+    "ReleaseEvent",
+}
+
+# the events API only keeps 300 events
+MAX_FEED_PAGES = 3
+
+# repos without an event for this long are dropped from the index, as are repos pending for this long
+ENTRY_TTL_SECONDS = 90 * 24 * 60 * 60
+
+
+class ChangeIndex:
+    def __init__(self, login: str, path=None):
+        self.path = path or state_path(f"change-index-{login}.json")
+        state = read_state(self.path)
+        # feed url => {"etag": ..., "last_event_id": ...}
+        self.feeds: dict[str, dict] = state.get("feeds", {})
+        # repo full name => timestamp of its last relevant event
+        self.repos: dict[str, float] = state.get("repos", {})
+        # command => timestamp of when it last consumed the index
+        self.cursors: dict[str, float] = state.get("cursors", {})
+        # command => repos handed out but not processed yet => when they were handed out
+        self.pending: dict[str, dict[str, float]] = state.get("pending", {})
+        # events published before this timestamp may have been missed, a feed had more new events than it keeps
+        self.lost_at: float = state.get("lost_at", 0)
+
+        # shards and queue workers update the same file, only our own changes are written back (see `save`)
+        self._dirty_feeds: set[str] = set()
+        self._dirty_cursors: set[str] = set()
+        self._added: dict[str, dict[str, float]] = {}
+        self._processed: dict[str, set[str]] = {}
+
+    def poll_feed(self, requester: Requester, url: str) -> int:
+        """
+        Add the events published since the last poll of `url` to the index. Returns the number of new events.
+        """
+
+        feed = self.feeds.get(url, {})
+        headers = {"If-None-Match": feed["etag"]} if feed.get("etag") else {}
+        last_event_id = int(feed.get("last_event_id", 0))
+        requested_at = time.time()
+
+        response_headers, events = requester.requestJsonAndCheck(
+            "GET", url, parameters={"per_page": 100}, headers=headers
+        )
+
+        etag = response_headers.get("etag")
+
+        if not events:
+            # 304 Not Modified, or no events at all
+            if etag:
+                self.feeds[url] = {"etag": etag, "last_event_id": last_event_id}
+                self._dirty_feeds.add(url)
+
+            return 0
+
+        newest_event_id = int(events[0]["id"])
+        new_events = []
+        next_url = None
+
+        for page in range(1, MAX_FEED_PAGES + 1):
+            unseen = [event for event in events if int(event["id"]) > last_event_id]
+            new_events += unseen
+
+            # events come newest first, a page with a seen event reaches back to the last poll
+            next_url = parse_link_header(response_headers).get("next")
+
+            if len(unseen) < len(events) or not next_url or page == MAX_FEED_PAGES:
+                break
+
+            response_headers, events = requester.requestJsonAndCheck("GET", next_url)
+
+        # never reached an event seen before although the feed has more (or is capped): events in between are gone
+        if (
+            last_event_id
+            and len(unseen) == len(events)
+            and (next_url or page == MAX_FEED_PAGES)
+        ):
+            log.warning(
+                "events feed overflowed since the last poll, every repo is processed",
+                url=url,
+                new_events=len(new_events),
+            )
+            self.lost_at = max(self.lost_at, requested_at)
+
+        for event in new_events:
+            if event["type"] not in RELEVANT_EVENT_TYPES:
+                continue
+
+            repo_name = event["repo"]["name"]
+            event_at = datetime.fromisoformat(
+                event["created_at"].replace("Z", "+00:00")
+            ).timestamp()
+
+            self.repos[repo_name] = max(self.repos.get(repo_name, 0), event_at)
+
+        self.feeds[url] = {
+            "etag": etag,
+            "last_event_id": max(newest_event_id, last_event_id),
+        }
+        self._dirty_feeds.add(url)
+
+        return len(new_events)
+
+    def changed_since(self, since: float) -> set[str]:
+        return {repo for repo, event_at in self.repos.items() if event_at > since}
+
+    def set_cursor(self, command: str, cursor: float) -> None:
+        self.cursors[command] = cursor
+        self._dirty_cursors.add(command)
+
+    def add_pending(self, command: str, repo_names: t.Iterable[str]) -> None:
+        now = time.time()
+
+        for repo_name in repo_names:
+            self.pending.setdefault(command, {})[repo_name] = now
+            self._added.setdefault(command, {})[repo_name] = now
+            self._processed.get(command, set()).discard(repo_name)
+
+    def mark_processed(self, command: str, repo_name: str) -> None:
+        self.pending.get(command, {}).pop(repo_name, None)
+        self._added.get(command, {}).pop(repo_name, None)
+        self._processed.setdefault(command, set()).add(repo_name)
+
+    def save(self) -> None:
+        state = update_state(self.path, self._merge)
+
+        self.feeds = state["feeds"]
+        self.repos = state["repos"]
+        self.cursors = state["cursors"]
+        self.pending = state["pending"]
+        self.lost_at = state["lost_at"]
+
+        self._dirty_feeds = set()
+        self._dirty_cursors = set()
+        self._added = {}
+        self._processed = {}
+
+    def _merge(self, state: dict[str, t.Any]) -> dict[str, t.Any]:
+        # other processes may have written since we read, only our own changes are applied
+        now = time.time()
+
+        feeds = state.get("feeds", {}) | {
+            url: self.feeds[url] for url in self._dirty_feeds
+        }
+        cursors = state.get("cursors", {}) | {
+            command: self.cursors[command] for command in self._dirty_cursors
+        }
+
+        repos = state.get("repos", {})
+
+        for repo, event_at in self.repos.items():
+            repos[repo] = max(repos.get(repo, 0), event_at)
+
+        pending = state.get("pending", {})
+
+        for command, added in self._added.items():
+            pending.setdefault(command, {}).update(added)
+
+        for command, processed in self._processed.items():
+            for repo_name in processed:
+                pending.get(command, {}).pop(repo_name, None)
+
+        return {
+            "feeds": feeds,
+            "repos": {
+                repo: event_at
+                for repo, event_at in repos.items()
+                if now - event_at <= ENTRY_TTL_SECONDS
+            },
+            "cursors": cursors,
+            "pending": {
+                command: {
+                    repo_name: handed_out_at
+                    for repo_name, handed_out_at in repo_names.items()
+                    if now - handed_out_at <= ENTRY_TTL_SECONDS
+                }
+                for command, repo_names in pending.items()
+            },
+            "lost_at": max(state.get("lost_at", 0), self.lost_at),
+        }
+
+
+def mark_processed(command: str, login: str, repo_name: str) -> None:
+    """
+    `repo_name` was processed by `command`, it is only handed out again once it changes
+    """
+
+    index = ChangeIndex(login)
+    index.mark_processed(command, repo_name)
+    index.save()
+
+
+def only_changed(
+    command: str, github: Github, repos: t.Iterable[Repository]
+) -> t.Iterator[Repository]:
+    """
+    The repos in `repos` with activity since `command` last consumed the index, plus the repos still pending from
+    earlier runs. Every repo is returned the first time a command runs (there is nothing to compare against yet) and
+    after a feed overflowed.
+
+    The returned repos stay pending until they are marked as processed: by the run journal of the current run (see
+    `checkpoint.on_repo_completed`) or by whoever runs them later through `mark_processed`.
+    """
+
+    login = github.get_user().login
+    requester = github.requester
+    index = ChangeIndex(login)
+    candidates = list(repos)
+    candidate_names = {repo.full_name for repo in candidates}
+    started_at = time.time()
+
+    new_events = index.poll_feed(requester, f"/users/{login}/events")
+    new_events += index.poll_feed(requester, f"/users/{login}/received_events")
+
+    # activity by others on repos the user does not own (keep-alive-prs) is not in the user feeds
+    for repo in candidates:
+        if repo.owner.login != login:
+            new_events += index.poll_feed(requester, f"/repos/{repo.full_name}/events")
+
+    cursor = index.cursors.get(command)
+    pending = index.pending.get(command, {})
+
+    # repos which are no longer listed (archived, filtered out) are not going to be processed
+    for repo_name in set(pending) - candidate_names:
+        index.mark_processed(command, repo_name)
+
+    if cursor is None:
+        log.info("no change cursor yet, processing every repo", command=command)
+        changed_repos = candidates
+    elif cursor < index.lost_at:
+        log.info("events were missed, processing every repo", command=command)
+        changed_repos = candidates
+    else:
+        changed = index.changed_since(cursor - CHANGE_GRACE_SECONDS) | set(pending)
+        changed_repos = [repo for repo in candidates if repo.full_name in changed]
+
+        log.info(
+            "limited repos to changed set",
+            command=command,
+            new_events=new_events,
+            pending=len(pending),
+            changed=len(changed_repos),
+            skipped=len(candidates) - len(changed_repos),
+        )
+
+    # saved before anything is handed out: the polled events must not be fetched again and the handed out repos are
+    # pending even if this run does not finish
+    index.add_pending(command, [repo.full_name for repo in changed_repos])
+    index.save()
+
+    def repo_completed(repo_name: str) -> None:
+        if repo_name in candidate_names:
+            index.mark_processed(command, repo_name)
+            index.save()
+
+    checkpoint.on_repo_completed(repo_completed)
+
+    yield from changed_repos
+
+    # a run which processed everything because of an overflow covered the missed events
+    index.set_cursor(command, max(started_at, index.lost_at))
+    index.save()
@@ -0,0 +1,235 @@
+"""
+Run journal for resuming interrupted runs.
+
+Each command appends its progress (completed repos, merged PRs, created releases) to a JSON lines file in the state
+directory as it goes. With `--resume`, repos completed by the last unfinished run are skipped. A run stopped by a
+command or run deadline is resumed by the next run automatically, repos and PRs abandoned because of their own deadline
+are recorded as `repo_deferred` / `pr_deferred`.
+"""
+
+import contextvars
+import json
+import time
+import typing as t
+import uuid
+from contextlib import contextmanager
+from dataclasses import dataclass
+from pathlib import Path
+
+from github.Repository import Repository
+
+from .deadlines import REPO_DEADLINE_SECONDS, DeadlineExceeded, deadline
+from .state import state_path
+from .utils import log
+
+_current_journal: contextvars.ContextVar["RunJournal | None"] = contextvars.ContextVar(
+    "current_journal", default=None
+)
+
+
+class RunJournal:
+    def __init__(self, path: Path, run_id: str, completed_repos: set[str]):
+        self.path = path
+        self.run_id = run_id
+        self.completed_repos = completed_repos
+        self._completion_listeners: list[t.Callable[[str], None]] = []
+        self._file = open(
+            path, "a", encoding="utf-8"
+        )  # pylint: disable=consider-using-with
+
+    @classmethod
+    def start(cls, command: str, scope: str, resume: bool) -> "RunJournal":
+        """
+        `scope` identifies who the run is for (e.g. the user login), a journal for another scope is never resumed
+        """
+
+        path = state_path(f"journal-{command}.jsonl")
+        entries = read_entries(path)
+        last_start = next(
+            (entry for entry in reversed(entries) if entry["event"] == "run_started"),
+            None,
+        )
+
+        # a run cut short by a deadline continues where it stopped, the schedule would otherwise never get past it
+        deferred = bool(entries) and entries[-1]["event"] == "run_deferred"
+
+        resumable = (
+            (resume or deferred)
+            and last_start is not None
+            and last_start.get("scope") == scope
+            and entries[-1]["event"] != "run_completed"
+        )
+
+        if resumable:
+            assert last_start
+            run_id = last_start["run_id"]
+            completed_repos = {
+                entry["repo"]
+                for entry in entries
+                if entry["event"] == "repo_completed" and entry["run_id"] == run_id
+            }
+
+            log.info(
+                "resuming from checkpoint",
+                run_id=run_id,
+                deferred=deferred,
+                completed_repos=len(completed_repos),
+            )
+
+            return cls(path, run_id, completed_repos)
+
+        if resume:
+            log.info("no unfinished run to resume, starting from scratch")
+
+        # only the latest run is needed, start a fresh file
+        path.unlink(missing_ok=True)
+
+        journal = cls(path, uuid.uuid4().hex, set())
+        journal.record("run_started", scope=scope, command=command)
+        return journal
+
+    def record(self, event: str, **fields) -> None:
+        entry = {"event": event, "run_id": self.run_id, "at": time.time(), **fields}
+
+        # flushed on every write, a crash right after must not lose the entry
+        self._file.write(json.dumps(entry) + "\n")
+        self._file.flush()
+
+    def is_completed(self, repo_name: str) -> bool:
+        return repo_name in self.completed_repos
+
+    def repo_completed(self, repo_name: str) -> None:
+        self.completed_repos.add(repo_name)
+        self.record("repo_completed", repo=repo_name)
+
+        for listener in self._completion_listeners:
+            listener(repo_name)
+
+    def on_repo_completed(self, listener: t.Callable[[str], None]) -> None:
+        """
+        Call `listener` for every completed repo, including the repos completed before the run was resumed
+        """
+
+        for repo_name in self.completed_repos:
+            listener(repo_name)
+
+        self._completion_listeners.append(listener)
+
+    def checkpointed(
+        self, process: t.Callable[[Repository], t.Any]
+    ) -> t.Callable[[Repository], t.Any]:
+        """
+        Wrap a per-repo function: repos completed in the resumed run are skipped, the rest are recorded once done
+        """
+
+        def wrapper(repo: Repository):
+            if self.is_completed(repo.full_name):
+                log.debug(
+                    "repo completed in previous run, skipping", repo=repo.full_name
+                )
+                return None
+
+            result = None
+
+            with deferrable("repo", REPO_DEADLINE_SECONDS, repo=repo.full_name):
+                result = process(repo)
+                self.repo_completed(repo.full_name)
+
+            return result
+
+        return wrapper
+
+    def close(self, completed: bool) -> None:
+        if completed:
+            self.record("run_completed", repos=len(self.completed_repos))
+
+        self._file.close()
+
+
+def read_entries(path: Path) -> list[dict]:
+    if not path.exists():
+        return []
+
+    entries = []
+
+    with open(path, encoding="utf-8") as f:
+        for line in f:
+            try:
+                entries.append(json.loads(line))
+            except json.JSONDecodeError:
+                # the process died in the middle of a write
+                log.warning("skipping corrupt journal entry", path=str(path))
+
+    return entries
+
+
+@contextmanager
+def run_journal(command: str, scope: str, resume: bool) -> t.Iterator[RunJournal]:
+    """
+    The run is only marked as completed if the block exits without an exception
+    """
+
+    journal = RunJournal.start(command, scope, resume)
+    token = _current_journal.set(journal)
+    completed = False
+
+    try:
+        yield journal
+        completed = True
+    except DeadlineExceeded as e:
+        log.warning("deadline exceeded, deferring the rest of the run", scope=e.scope)
+        journal.record(
+            "run_deferred", scope=e.scope, repos=len(journal.completed_repos)
+        )
+    finally:
+        _current_journal.reset(token)
+        journal.close(completed)
+
+
+def record(event: str, **fields) -> None:
+    """
+    Record an event (e.g. "pr_merged") in the journal of the current run, if there is one
+    """
+
+    if journal := _current_journal.get():
+        journal.record(event, **fields)
+
+
+def on_repo_completed(listener: t.Callable[[str], None]) -> bool:
+    """
+    Register `listener` with the journal of the current run. Returns False if there is no journal.
+    """
+
+    if journal := _current_journal.get():
+        journal.on_repo_completed(listener)
+        return True
+
+    return False
+
+
+@dataclass
+class Deferral:
+    deferred: bool = False
+
+
+@contextmanager
+def deferrable(scope: str, seconds: float, **fields) -> t.Iterator[Deferral]:
+    """
+    Run the block under a `scope` deadline. If it expires the rest of the block is skipped and recorded as
+    `{scope}_deferred` with `fields`, enclosing deadlines are raised as usual.
+    """
+
+    deferral = Deferral()
+
+    try:
+        with deadline(scope, seconds):
+            yield deferral
+    except DeadlineExceeded as e:
+        if e.scope != scope:
+            raise
+
+        log.warning(
+            "deadline exceeded, deferring", scope=scope, seconds=seconds, **fields
+        )
+        record(f"{scope}_deferred", **fields)
+        deferral.deferred = True
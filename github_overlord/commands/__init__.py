@@ -0,0 +1,71 @@
+"""
+One module per CLI command. These are loaded lazily by the `cli` group in the package root, do not import them there.
+"""
+
+import click
+from decouple import config
+
+from ..dependabot_merger import MERGE_POLICY_UPDATE_TYPES
+from ..repo_filter import DEFAULT_MAX_INACTIVE_DAYS
+
+# shared by every command which lists the user's repos
+max_inactive_days_option = click.option(
+    "--max-inactive-days",
+    type=int,
+    default=config(
+        "GITHUB_OVERLORD_MAX_INACTIVE_DAYS", default=DEFAULT_MAX_INACTIVE_DAYS, cast=int
+    ),
+    show_default=True,
+    help="Skip repos without a push in this many days, 0 disables the cutoff (can also be set via "
+    "GITHUB_OVERLORD_MAX_INACTIVE_DAYS)",
+)
+
+changed_only_option = click.option(
+    "--changed-only",
+    is_flag=True,
+    default=config("GITHUB_OVERLORD_CHANGED_ONLY", default=False, cast=bool),
+    help="Only process repos with activity (PRs, pushes, comments) in the events feeds since the command last ran "
+    "(can also be set via GITHUB_OVERLORD_CHANGED_ONLY)",
+)
+
+
+def dependabot_options(command):
+    """
+    The options of the dependabot command, for the commands which run it (or another repo command) in bulk
+    """
+
+    options = [
+        click.option(
+            "--merge-policy",
+            type=click.Choice(list(MERGE_POLICY_UPDATE_TYPES)),
+            default=config("DEPENDABOT_MERGE_POLICY", default="all"),
+            show_default=True,
+            help="Only merge Dependabot updates up to this semver level (can also be set via "
+            "DEPENDABOT_MERGE_POLICY)",
+        ),
+        click.option(
+            "--skip-maintainer-changes",
+            is_flag=True,
+            help="Do not merge Dependabot updates where the dependency changed maintainers",
+        ),
+        click.option(
+            "--auto-merge",
+            is_flag=True,
+            default=config("DEPENDABOT_AUTO_MERGE", default=False, cast=bool),
+            help="Enable GitHub's auto-merge on Dependabot PRs still waiting for CI instead of skipping them (can "
+            "also be set via DEPENDABOT_AUTO_MERGE)",
+        ),
+        click.option(
+            "--search",
+            is_flag=True,
+            default=config("DEPENDABOT_SEARCH", default=False, cast=bool),
+            help="Find repos with open Dependabot PRs with a single search instead of listing every repo (can also "
+            "be set via DEPENDABOT_SEARCH)",
+        ),
+    ]
+
+    # applied bottom up, keep the order of the options in --help
+    for option in reversed(options):
+        command = option(command)
+
+    return command
@@ -0,0 +1,126 @@
+import os
+
+import click
+import funcy_pipe as fp
+from github import Github
+
+from ..checkpoint import run_journal
+from ..config import RELEASE_ANALYSIS_BATCH_SIZE
+from ..release_checker import check_repo_for_release, check_repos_for_release
+from ..repo_tasks import TaskOptions, list_repos
+from ..utils import extract_repo_reference_from_github_url, log
+from . import changed_only_option, max_inactive_days_option
+
+
+@click.command()
+@click.option("--dry-run", is_flag=True, help="Run script without creating releases")
+@click.option(
+    "--topic",
+    help="Only process repos with this topic (can also be set via RELEASE_CHECKER_TOPIC)",
+    default=os.getenv("RELEASE_CHECKER_TOPIC"),
+)
+@click.option("--repo", help="Only process a single repository")
+@click.option(
+    "--resume",
+    is_flag=True,
+    help="Skip repos completed by the last run if it was interrupted",
+)
+@click.option(
+    "--batch-size",
+    type=int,
+    default=RELEASE_ANALYSIS_BATCH_SIZE,
+    show_default=True,
+    help="Analyze the commits of up to this many repos in a single LLM request",
+)
+@max_inactive_days_option
+@changed_only_option
+def check_releases(
+    dry_run, topic, repo, resume, max_inactive_days, batch_size, changed_only
+):
+    """
+    Check repositories for release readiness using LLM analysis and create releases when appropriate
+    """
+
+    token = os.getenv("GITHUB_TOKEN")
+    assert token, "GITHUB_TOKEN environment variable is required"
+    assert os.getenv(
+        "GOOGLE_API_KEY"
+    ), "GOOGLE_API_KEY environment variable is required"
+
+    log.info("checking repositories for release readiness")
+
+    g = Github(token)
+
+    repo = extract_repo_reference_from_github_url(repo)
+
+    if repo:
+        result = check_repo_for_release(g.get_repo(repo), dry_run)
+        if result["created"]:
+            log.info("Release check complete - created 1 release")
+        elif result["failed"]:
+            log.info("Release check complete - failed to create release")
+        else:
+            log.info("Release check complete - no release needed")
+        return
+
+    # Topic is required when not specifying a single repo
+    assert (
+        topic
+    ), "Topic is required when not specifying a single repository (use --topic or set RELEASE_CHECKER_TOPIC)"
+
+    log.info("filtering by topic", topic=topic)
+
+    # Get all public repos owned by user with the specified topic
+    options = TaskOptions(
+        dry_run=dry_run,
+        topic=topic,
+        max_inactive_days=max_inactive_days,
+        changed_only=changed_only,
+    )
+    repos = list_repos("check-releases", g, options)
+
+    # Process each repo and collect results, repos completed by an interrupted run are skipped with --resume
+    with run_journal(f"check-releases-{topic}", g.get_user().login, resume) as journal:
+        pending = repos | fp.remove(lambda r: journal.is_completed(r.full_name))
+        results = []
+
+        for checked_repo, result in check_repos_for_release(
+            pending, dry_run, batch_size
+        ):
+            # deferred repos are checked again by the next run
+            if not result["deferred"]:
+                journal.repo_completed(checked_repo.full_name)
+
+            results.append(result)
+
+    # Check if any repos were found
+    if not results:
+        log.warning("no repositories found with topic", topic=topic)
+        return
+
+    # Calculate statistics
+    total_checked = sum(1 for r in results if r["checked"])
+    total_skipped = sum(1 for r in results if r["skipped"])
+    total_created = sum(1 for r in results if r["created"])
+    total_failed = sum(1 for r in results if r["failed"])
+    total_deferred = sum(1 for r in results if r["deferred"])
+
+    # Log summary
+    if dry_run:
+        log.info(
+            "DRY RUN: Release check complete",
+            checked=total_checked,
+            would_create=total_created,
+            skipped=total_skipped,
+            errors=total_failed,
+            deferred=total_deferred,
+        )
+    else:
+        log.info(
+            "Release check complete",
+            checked=total_checked,
+            created=total_created,
+            skipped=total_skipped,
+            failed=total_failed,
+            deferred=total_deferred,
+        )
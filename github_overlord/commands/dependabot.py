@@ -0,0 +1,108 @@
+import os
+
+import click
+import funcy_pipe as fp
+from github import Github
+
+from ..checkpoint import run_journal
+from ..dependabot_merger import MergePolicy, process_repo
+from ..merge_failure_cache import MergeFailureCache
+from ..repo_tasks import TaskOptions, list_repos
+from ..utils import extract_repo_reference_from_github_url, log
+from . import changed_only_option, dependabot_options, max_inactive_days_option
+
+
+def merge_dependabot_prs(
+    token,
+    dry_run,
+    repo,
+    policy: MergePolicy,
+    resume=False,
+    max_inactive_days: int | None = None,
+    changed_only: bool = False,
+    search: bool = False,
+):
+    assert token, "GitHub token is required"
+
+    g = Github(token)
+    login = g.get_user().login
+
+    # scopes come from the headers of the request above
+    failure_cache = MergeFailureCache(g.oauth_scopes)
+
+    try:
+        if repo:
+            process_repo(g.get_repo(repo), dry_run, policy, failure_cache)
+            return
+
+        # if not, process everything!
+        with run_journal("dependabot", login, resume) as journal:
+            options = TaskOptions(
+                dry_run=dry_run,
+                max_inactive_days=max_inactive_days,
+                changed_only=changed_only,
+                search=search,
+            )
+            # with --search, only the PRs it found are evaluated instead of every open PR of the repo
+            pr_numbers: dict[str, list[int]] = {}
+
+            list_repos("dependabot", g, options, pr_numbers=pr_numbers) | fp.map(
+                journal.checkpointed(
+                    lambda repo: process_repo(
+                        repo,
+                        dry_run,
+                        policy,
+                        failure_cache,
+                        pr_numbers.get(repo.full_name),
+                    )
+                )
+            ) | fp.to_list()
+    finally:
+        failure_cache.save()
+        failure_cache.log_summary()
+
+    log.info("dependabot pr check complete")
+
+
+@click.command()
+@click.option(
+    "--token",
+    help="GitHub token, can also be set via GITHUB_TOKEN",
+    default=os.getenv("GITHUB_TOKEN"),
+)
+# TODO move this into the parent command
+@click.option("--dry-run", is_flag=True, help="Run script without merging PRs")
+@click.option("--repo", help="Only process a single repository")
+@dependabot_options
+@click.option(
+    "--resume",
+    is_flag=True,
+    help="Skip repos completed by the last run if it was interrupted",
+)
+@max_inactive_days_option
+@changed_only_option
+def dependabot(
+    token,
+    dry_run,
+    repo,
+    merge_policy,
+    skip_maintainer_changes,
+    auto_merge,
+    search,
+    resume,
+    max_inactive_days,
+    changed_only,
+):
+    """
+    Automatically merge dependabot PRs in public repos that have passed CI checks
+    """
+
+    log.info("merging dependabot PRs")
+
+    repo = extract_repo_reference_from_github_url(repo)
+
+    policy = MergePolicy.from_options(merge_policy, skip_maintainer_changes, auto_merge)
+
+    merge_dependabot_prs(
+        token, dry_run, repo, policy, resume, max_inactive_days, changed_only, search
+    )
@@ -0,0 +1,60 @@
+import os
+
+import click
+import funcy_pipe as fp
+from github import Github
+
+from ..checkpoint import run_journal
+from ..repo_tasks import TaskOptions, list_repos
+from ..stale_commenter import inspect_repo_for_stale_prs
+from ..utils import extract_repo_reference_from_github_url, log
+from . import changed_only_option, max_inactive_days_option
+
+
+@click.command()
+@click.option(
+    "--token",
+    help="GitHub token, can also be set via GITHUB_TOKEN",
+    default=os.getenv("GITHUB_TOKEN"),
+)
+# TODO move this into the parent command
+@click.option("--dry-run", is_flag=True, help="Run script without merging PRs")
+@click.option("--repo", help="Only process a single repository")
+@click.option(
+    "--resume",
+    is_flag=True,
+    help="Skip repos completed by the last run if it was interrupted",
+)
+@max_inactive_days_option
+@changed_only_option
+def keep_alive_prs(token, dry_run, repo, resume, max_inactive_days, changed_only):
+    """
+    Detect when a bot is about to close a PR for no good reason and make a comment to keep it alive
+    """
+
+    assert token, "GitHub token is required"
+    # TODO should assert on openai setup
+
+    log.info("checking for stale PRs")
+
+    github = Github(token)
+    user = github.get_user()
+    login = user.login
+
+    repo = extract_repo_reference_from_github_url(repo)
+
+    if repo:
+        inspect_repo_for_stale_prs(dry_run, login, github.get_repo(repo))
+        return
+
+    with run_journal("keep-alive-prs", login, resume) as journal:
+        options = TaskOptions(
+            dry_run=dry_run,
+            max_inactive_days=max_inactive_days,
+            changed_only=changed_only,
+        )
+        list_repos("keep-alive-prs", github, options) | fp.map(
+            journal.checkpointed(fp.partial(inspect_repo_for_stale_prs, dry_run, login))
+        ) | fp.to_list()
+
+    log.info("stale PR check complete")
@@ -0,0 +1,85 @@
+import json
+import os
+
+import click
+
+from ..accounts import load_accounts
+from ..repo_tasks import REPO_COMMANDS, TaskOptions
+from ..sharding import run_sharded
+from ..utils import log
+from . import changed_only_option, dependabot_options, max_inactive_days_option
+
+
+@click.command()
+@click.argument("command", type=click.Choice(REPO_COMMANDS))
+@click.option(
+    "--accounts-file",
+    help="JSON list of accounts, can also be set via GITHUB_OVERLORD_ACCOUNTS_FILE",
+    default=os.getenv("GITHUB_OVERLORD_ACCOUNTS_FILE"),
+    required=True,
+)
+@click.option(
+    "--workers",
+    type=int,
+    default=os.cpu_count(),
+    show_default=True,
+    help="Worker processes shared by all accounts",
+)
+@click.option("--dry-run", is_flag=True, help="Run script without making changes")
+@click.option(
+    "--topic",
+    help="check-releases only: only process repos with this topic (can also be set via RELEASE_CHECKER_TOPIC)",
+    default=os.getenv("RELEASE_CHECKER_TOPIC"),
+)
+@dependabot_options
+@max_inactive_days_option
+@changed_only_option
+@click.option("--report", type=click.Path(), help="Write the merged JSON report here")
+def multi_account(
+    command,
+    accounts_file,
+    workers,
+    dry_run,
+    topic,
+    merge_policy,
+    skip_maintainer_changes,
+    auto_merge,
+    search,
+    max_inactive_days,
+    changed_only,
+    report,
+):
+    """
+    Run a repo command for every account in an accounts file, sharding repos across worker processes
+    """
+
+    accounts = load_accounts(accounts_file)
+
+    log.info(
+        "running command for multiple accounts",
+        command=command,
+        accounts=len(accounts),
+        workers=workers,
+    )
+
+    options = TaskOptions(
+        dry_run=dry_run,
+        topic=topic,
+        merge_policy=merge_policy,
+        skip_maintainer_changes=skip_maintainer_changes,
+        auto_merge=auto_merge,
+        search=search,
+        max_inactive_days=max_inactive_days,
+        changed_only=changed_only,
+    )
+
+    result = run_sharded(accounts, command, options, workers)
+
+    for account, totals in result["accounts"].items():
+        log.info("account complete", account=account, **totals)
+
+    log.info("multi-account run complete", command=command, **result["total"])
+
+    if report:
+        with open(report, "w", encoding="utf-8") as f:
+            json.dump(result, f, indent=2)
@@ -0,0 +1,65 @@
+import os
+
+import click
+from github import Github
+
+from ..notification_cleaner import (
+    DONE_REASONS,
+    clean_notifications,
+    watch_notifications,
+)
+from ..pagination import prefetch_pages
+from ..utils import log
+
+
+@click.command()
+@click.option(
+    "--token",
+    help="GitHub token, can also be set via GITHUB_TOKEN",
+    default=os.getenv("GITHUB_TOKEN"),
+)
+# TODO move this into the parent command
+@click.option("--dry-run", is_flag=True, help="Run script without merging PRs")
+@click.option(
+    "--only-unread", is_flag=True, help="Only process a single repository", default=True
+)
+@click.option(
+    "--watch",
+    is_flag=True,
+    help="Keep running and clean new notifications as they arrive, polling as often as GitHub allows",
+)
+@click.option(
+    "--min-interval",
+    type=float,
+    default=60,
+    show_default=True,
+    help="With --watch, wait at least this many seconds between polls, even if GitHub allows polling more often",
+)
+def notifications(token, dry_run, only_unread, watch, min_interval):
+    """
+    Look at notifications and mark them as read if they are:
+
+    * Dependabot notifications
+    * Releases on repos I own
+    * Closed (merged, closed) pull requests on repos I own
+    * Closed pull requests that I authored
+
+    Helpful if you work across a lot of repos and want to keep your notifications clean.
+    """
+
+    github = Github(token)
+    user = github.get_user()
+    login = user.login
+
+    if watch:
+        watch_notifications(github, login, not only_unread, dry_run, min_interval)
+        return
+
+    # all includes read notifications AND done notifications :/
+    # there is no way to determine if a notification is marked as done
+    notifications = prefetch_pages(user.get_notifications(all=not only_unread))
+
+    marked = clean_notifications(notifications, login, dry_run)
+
+    for reason, message in DONE_REASONS.items():
+        log.info(message, count=marked[reason])
@@ -0,0 +1,148 @@
+import dataclasses
+import os
+
+import click
+from github import Github
+
+from ..accounts import resolve_accounts
+from ..queue_worker import run_workers
+from ..repo_tasks import REPO_COMMANDS, TaskOptions, list_repos
+from ..utils import extract_repo_reference_from_github_url, log
+from ..work_queue import DEFAULT_QUEUE_URL, open_work_queue
+from . import changed_only_option, dependabot_options, max_inactive_days_option
+
+queue_url_option = click.option(
+    "--queue-url",
+    help="Work queue location, can also be set via GITHUB_OVERLORD_QUEUE_URL",
+    default=os.getenv("GITHUB_OVERLORD_QUEUE_URL", DEFAULT_QUEUE_URL),
+    show_default=True,
+)
+token_option = click.option(
+    "--token",
+    help="GitHub token, can also be set via GITHUB_TOKEN",
+    default=os.getenv("GITHUB_TOKEN"),
+)
+accounts_file_option = click.option(
+    "--accounts-file",
+    help="JSON list of accounts (instead of --token), can also be set via GITHUB_OVERLORD_ACCOUNTS_FILE",
+    default=os.getenv("GITHUB_OVERLORD_ACCOUNTS_FILE"),
+)
+
+
+@click.group()
+def queue():
+    """
+    Run repo commands through a durable work queue, drained by worker processes which retry failed repos
+    """
+
+    pass
+
+
+@queue.command()
+@click.argument("command", type=click.Choice(REPO_COMMANDS))
+@queue_url_option
+@token_option
+@accounts_file_option
+@click.option("--repo", help="Only enqueue a single repository")
+@click.option("--dry-run", is_flag=True, help="Run tasks without making changes")
+@click.option(
+    "--topic",
+    help="check-releases only: only enqueue repos with this topic (can also be set via RELEASE_CHECKER_TOPIC)",
+    default=os.getenv("RELEASE_CHECKER_TOPIC"),
+)
+@dependabot_options
+@max_inactive_days_option
+@changed_only_option
+@click.option("--max-attempts", type=int, default=3, show_default=True)
+def enqueue(
+    command,
+    queue_url,
+    token,
+    accounts_file,
+    repo,
+    dry_run,
+    topic,
+    merge_policy,
+    skip_maintainer_changes,
+    auto_merge,
+    search,
+    max_inactive_days,
+    changed_only,
+    max_attempts,
+):
+    """
+    Add a task for every repo the command operates on
+    """
+
+    options = TaskOptions(
+        dry_run=dry_run,
+        topic=topic,
+        merge_policy=merge_policy,
+        skip_maintainer_changes=skip_maintainer_changes,
+        auto_merge=auto_merge,
+        search=search,
+        max_inactive_days=max_inactive_days,
+        changed_only=changed_only,
+    )
+    work_queue = open_work_queue(queue_url)
+
+    for account in resolve_accounts(accounts_file, token):
+        if repo:
+            repo_names = [extract_repo_reference_from_github_url(repo)]
+        else:
+            github = Github(account.token)
+            repo_names = [
+                r.full_name for r in list_repos(command, github, options, account.orgs)
+            ]
+
+        added = work_queue.enqueue(
+            command,
+            account.name,
+            repo_names,
+            dataclasses.asdict(options),
+            max_attempts=max_attempts,
+        )
+
+        log.info(
+            "enqueued tasks",
+            command=command,
+            account=account.name,
+            repos=len(repo_names),
+            added=added,
+        )
+
+
+@queue.command()
+@queue_url_option
+@token_option
+@accounts_file_option
+@click.option("--workers", type=int, default=1, show_default=True)
+@click.option(
+    "--until-empty", is_flag=True, help="Exit once there are no claimable tasks left"
+)
+def work(queue_url, token, accounts_file, workers, until_empty):
+    """
+    Start worker processes which claim and run tasks
+    """
+
+    accounts = resolve_accounts(accounts_file, token)
+
+    log.info("starting workers", workers=workers, queue_url=queue_url)
+    run_workers(queue_url, accounts, workers, until_empty)
+
+    log.info("queue status", **open_work_queue(queue_url).stats())
+
+
+@queue.command()
+@queue_url_option
+def status(queue_url):
+    """
+    Show task counts by status and the tasks which exhausted their retries
+    """
+
+    work_queue = open_work_queue(queue_url)
+
+    log.info("queue status", **work_queue.stats())
+
+    for task in work_queue.failed_tasks():
+        log.warning("failed task", **task)
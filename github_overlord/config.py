@@ -2,6 +2,7 @@
 from pathlib import Path
 
 import jinja2
+from decouple import config
 
 # Set up paths
 ROOT_DIRECTORY = Path(__file__).parent.parent.resolve()
@@ -15,3 +16,14 @@ JINJA_ENV = jinja2.Environment(
     trim_blocks=True,
     lstrip_blocks=True
 )
+
+# token budget for the commit summary in the release analysis prompt, larger ranges are summarized in chunks
+RELEASE_PROMPT_TOKEN_BUDGET = config("RELEASE_PROMPT_TOKEN_BUDGET", default=4000, cast=int)
+# upper bound on parallel chunk summaries, commits beyond this are dropped (oldest first)
+RELEASE_PROMPT_MAX_CHUNKS = config("RELEASE_PROMPT_MAX_CHUNKS", default=8, cast=int)
+# upper bound on commits fetched since the last release, each page of 30 commits is a request
+RELEASE_MAX_COMMITS = config("RELEASE_MAX_COMMITS", default=1000, cast=int)
+# repos analyzed per LLM request by check-releases, 1 makes one request per repo
+RELEASE_ANALYSIS_BATCH_SIZE = config("RELEASE_ANALYSIS_BATCH_SIZE", default=1, cast=int)
+# upper bound on the commit summaries packed into a single batched request
+RELEASE_BATCH_TOKEN_BUDGET = config("RELEASE_BATCH_TOKEN_BUDGET", default=16000, cast=int)
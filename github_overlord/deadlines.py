@@ -0,0 +1,133 @@
+"""
+Cooperative deadlines, so one pathological repo or PR cannot stall a scheduled run.
+
+Deadlines nest: run > command > repo > pr. Long loops (listing pages, `mergeable` polling, PRs of a repo) call
+`check_deadline`, which raises `DeadlineExceeded` for the outermost expired deadline, and LLM calls get a timeout
+which ends with the closest deadline. A block whose own deadline expired is abandoned and recorded as deferred (see
+`checkpoint.deferrable`), an enclosing deadline keeps propagating until its own scope.
+
+Deadlines are wall clock timestamps so they can be handed to worker processes.
+"""
+
+import contextvars
+import time
+import typing as t
+from contextlib import contextmanager
+from dataclasses import dataclass
+
+from decouple import config
+
+# seconds, 0 disables the deadline
+PR_DEADLINE_SECONDS = t.cast(
+    float, config("GITHUB_OVERLORD_PR_DEADLINE", default=120, cast=float)
+)
+REPO_DEADLINE_SECONDS = t.cast(
+    float, config("GITHUB_OVERLORD_REPO_DEADLINE", default=900, cast=float)
+)
+COMMAND_DEADLINE_SECONDS = t.cast(
+    float, config("GITHUB_OVERLORD_COMMAND_DEADLINE", default=0, cast=float)
+)
+RUN_DEADLINE_SECONDS = t.cast(
+    float, config("GITHUB_OVERLORD_RUN_DEADLINE", default=0, cast=float)
+)
+
+# upper bound for a single LLM request, shortened further by any active deadline
+LLM_TIMEOUT_SECONDS = t.cast(
+    float, config("GITHUB_OVERLORD_LLM_TIMEOUT", default=60, cast=float)
+)
+
+
+class DeadlineExceeded(Exception):
+    def __init__(self, scope: str):
+        super().__init__(f"{scope} deadline exceeded")
+        self.scope = scope
+
+
+@dataclass(frozen=True)
+class Deadline:
+    scope: str
+    expires_at: float
+    parent: "Deadline | None"
+
+
+_current_deadline: contextvars.ContextVar[Deadline | None] = contextvars.ContextVar(
+    "current_deadline", default=None
+)
+
+
+@contextmanager
+def deadline(
+    scope: str, seconds: float | None = None, expires_at: float | None = None
+) -> t.Iterator[None]:
+    """
+    Limit the block to `seconds` (or until the `expires_at` timestamp). Without either, only enclosing deadlines apply.
+    """
+
+    if seconds:
+        expires_at = time.time() + seconds
+
+    if expires_at is None:
+        yield
+        return
+
+    token = _current_deadline.set(
+        Deadline(scope, expires_at, parent=_current_deadline.get())
+    )
+
+    try:
+        yield
+    finally:
+        _current_deadline.reset(token)
+
+
+def active_deadlines() -> t.Iterator[Deadline]:
+    current = _current_deadline.get()
+
+    while current is not None:
+        yield current
+        current = current.parent
+
+
+def expires_at() -> float | None:
+    """
+    The closest active deadline as a timestamp, None without any
+    """
+
+    return min((d.expires_at for d in active_deadlines()), default=None)
+
+
+def expired_scope() -> str | None:
+    """
+    The outermost expired deadline, so whoever catches it unwinds everything the deadline covers
+    """
+
+    now = time.time()
+    expired = None
+
+    for current in active_deadlines():
+        if now >= current.expires_at:
+            expired = current.scope
+
+    return expired
+
+
+def check_deadline() -> None:
+    if scope := expired_scope():
+        raise DeadlineExceeded(scope)
+
+
+def remaining_seconds(limit: float) -> float:
+    """
+    `limit`, shortened to the time left before the closest deadline. Raises if a deadline already expired.
+    """
+
+    check_deadline()
+
+    if (closest := expires_at()) is None:
+        return limit
+
+    return min(limit, closest - time.time())
+
+
+def llm_timeout() -> float:
+    return remaining_seconds(LLM_TIMEOUT_SECONDS)
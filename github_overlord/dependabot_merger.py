@@ -0,0 +1,590 @@
+import time
+import typing as t
+from dataclasses import dataclass
+
+import funcy_pipe as fp
+from github import GithubException
+from github.GithubObject import NotSet
+from github.PullRequest import PullRequest
+
+from . import checkpoint
+from .deadlines import PR_DEADLINE_SECONDS, check_deadline
+from .dependabot_metadata import (
+    UpdatedDependency,
+    parse_pull_request,
+    parse_pull_requests,
+)
+from .graphql import alias, batched, errors_by_alias, graphql_request
+from .merge_failure_cache import MergeFailureCache
+from .pagination import prefetch_pages
+from .tracing import span
+from .utils import log
+
+AUTOMATIC_MERGE_MESSAGE = "Automatically merged with [github-overlord](https://github.com/iloveitaly/github-overlord)"
+AUTO_MERGE_ENABLED_MESSAGE = (
+    "Enabled auto-merge with [github-overlord](https://github.com/iloveitaly/github-overlord), "
+    "this PR will be merged once CI passes"
+)
+
+# merges per GraphQL request. Every merge is a content creating request for GitHub's secondary rate limits, this keeps
+# a batch well within them
+MERGE_BATCH_SIZE = 10
+
+# `--merge-policy` choices => update types which may be merged, None allows anything
+MERGE_POLICY_UPDATE_TYPES: dict[str, frozenset[str] | None] = {
+    "all": None,
+    "minor": frozenset({"version-update:semver-minor", "version-update:semver-patch"}),
+    "patch": frozenset({"version-update:semver-patch"}),
+}
+
+
+@dataclass(frozen=True)
+class MergePolicy:
+    """
+    Rules which are evaluated against the PR listing payload alone, before any status or check-run requests are made
+    """
+
+    allowed_update_types: frozenset[str] | None = None
+    skip_maintainer_changes: bool = False
+    # PRs with pending CI get GitHub's native auto-merge instead of waiting for the next run
+    auto_merge: bool = False
+
+    @classmethod
+    def from_options(
+        cls, merge_policy: str, skip_maintainer_changes: bool, auto_merge: bool = False
+    ):
+        return cls(
+            allowed_update_types=MERGE_POLICY_UPDATE_TYPES[merge_policy],
+            skip_maintainer_changes=skip_maintainer_changes,
+            auto_merge=auto_merge,
+        )
+
+    @property
+    def filters_updates(self) -> bool:
+        return self.allowed_update_types is not None or self.skip_maintainer_changes
+
+    def rejection_reason(self, dependencies: list[UpdatedDependency]) -> str | None:
+        if self.allowed_update_types is not None:
+            if not dependencies:
+                return "could not determine update type"
+
+            disallowed = [
+                dependency["dependencyName"]
+                for dependency in dependencies
+                if dependency["updateType"] not in self.allowed_update_types
+            ]
+
+            if disallowed:
+                return f"update type not allowed for {', '.join(disallowed)}"
+
+        if self.skip_maintainer_changes and any(
+            dependency["maintainerChanges"] for dependency in dependencies
+        ):
+            return "maintainer changes"
+
+        return None
+
+
+DEFAULT_MERGE_POLICY = MergePolicy()
+
+# `merge_readiness` results: "pending" PRs only wait for CI
+MergeReadiness = t.Literal["ready", "pending", "blocked"]
+
+
+def merge_pr(pr, dry_run, failure_cache: MergeFailureCache | None = None) -> bool:
+    """
+    Returns False if the merge failed in a way that will not resolve itself (recorded in `failure_cache`)
+    """
+
+    if dry_run:
+        log.info("would merge PR", pr=pr.html_url)
+        return True
+
+    try:
+        # the head the PR was evaluated at, a PR which got new commits since is not merged
+        pr.merge(merge_method="squash", sha=pr.head.sha)
+    except GithubException as e:
+        if failure_cache is None or not failure_cache.record(pr, e):
+            raise
+
+        log.error(
+            "failed to merge PR, skipping until the PR or token scopes change",
+            pr=pr.html_url,
+            status=e.status,
+            error=str(e),
+        )
+        return False
+
+    # comment after merging, a failed merge should not leave a "merged" comment behind
+    pr.create_issue_comment(AUTOMATIC_MERGE_MESSAGE)
+
+    record_merged(pr, failure_cache)
+    return True
+
+
+def record_merged(pr: PullRequest, failure_cache: MergeFailureCache | None) -> None:
+    log.info("merged PR", pr=pr.html_url)
+    checkpoint.record("pr_merged", pr=pr.html_url)
+
+    if failure_cache:
+        failure_cache.forget(pr)
+
+
+def merge_prs(
+    prs: list[PullRequest], dry_run, failure_cache: MergeFailureCache | None = None
+) -> int:
+    """
+    Merge PRs which were found eligible with aliased GraphQL mutations: one request for the merges and one for the
+    comments per batch, instead of two REST requests per PR. PRs which fail in a batch are retried one by one with
+    `merge_pr`.
+
+    Returns the number of merged PRs
+    """
+
+    if dry_run or len(prs) <= 1:
+        return sum(merge_pr(pr, dry_run, failure_cache) for pr in prs)
+
+    merged_count = 0
+
+    for batch in batched(prs, MERGE_BATCH_SIZE):
+        merged, failed = bulk_merge(batch)
+
+        # comment after merging, only on the PRs which were merged
+        if merged:
+            bulk_comment(merged, AUTOMATIC_MERGE_MESSAGE)
+
+        for pr in merged:
+            record_merged(pr, failure_cache)
+
+        merged_count += len(merged)
+
+        for pr, error in failed:
+            log.warning(
+                "bulk merge failed, retrying PR on its own", pr=pr.html_url, error=error
+            )
+
+            try:
+                if merge_pr(pr, dry_run, failure_cache):
+                    merged_count += 1
+            except GithubException as e:
+                log.error(
+                    "failed to merge PR", pr=pr.html_url, status=e.status, error=str(e)
+                )
+
+    return merged_count
+
+
+def bulk_merge(
+    prs: list[PullRequest],
+) -> tuple[list[PullRequest], list[tuple[PullRequest, str]]]:
+    """
+    Squash merge `prs` in one request. `expectedHeadOid` makes GitHub reject a PR which got new commits after it was
+    evaluated.
+
+    Returns the merged PRs, and the PRs which were not merged with the reason
+    """
+
+    declarations = []
+    selections = []
+    variables = {}
+
+    for index, pr in enumerate(prs):
+        declarations.append(f"$pr{index}: ID!, $head{index}: GitObjectID!")
+        selections.append(
+            f"{alias(index)}: mergePullRequest(input: {{pullRequestId: $pr{index}, mergeMethod: SQUASH, "
+            f"expectedHeadOid: $head{index}}}) {{ pullRequest {{ merged }} }}"
+        )
+        variables[f"pr{index}"] = pr.node_id
+        variables[f"head{index}"] = pr.head.sha
+
+    query = f"mutation({', '.join(declarations)}) {{ {' '.join(selections)} }}"
+
+    try:
+        with span("bulk_merge", prs=len(prs)):
+            response = graphql_request(prs[0]._requester, query, variables)
+    except GithubException as e:
+        return [], [(pr, str(e)) for pr in prs]
+
+    data = response.get("data") or {}
+    errors = errors_by_alias(response)
+
+    merged = []
+    failed = []
+
+    for index, pr in enumerate(prs):
+        node = data.get(alias(index))
+
+        if node and node["pullRequest"]["merged"]:
+            merged.append(pr)
+        else:
+            failed.append((pr, errors.get(alias(index), "not merged")))
+
+    return merged, failed
+
+
+def bulk_comment(prs: list[PullRequest], body: str) -> None:
+    declarations = ["$body: String!"]
+    selections = []
+    variables = {"body": body}
+
+    for index, pr in enumerate(prs):
+        declarations.append(f"$pr{index}: ID!")
+        selections.append(
+            f"{alias(index)}: addComment(input: {{subjectId: $pr{index}, body: $body}}) {{ clientMutationId }}"
+        )
+        variables[f"pr{index}"] = pr.node_id
+
+    query = f"mutation({', '.join(declarations)}) {{ {' '.join(selections)} }}"
+
+    try:
+        response = graphql_request(prs[0]._requester, query, variables)
+    except GithubException as e:
+        log.warning("failed to comment on merged PRs", count=len(prs), error=str(e))
+        return
+
+    prs_by_alias = {alias(index): pr for index, pr in enumerate(prs)}
+
+    for pr_alias, error in errors_by_alias(response).items():
+        log.warning(
+            "failed to comment on merged PR",
+            pr=prs_by_alias[pr_alias].html_url,
+            error=error,
+        )
+
+
+def enable_auto_merge(prs: list[PullRequest], dry_run) -> int:
+    """
+    Hand PRs which only wait for CI to GitHub's native auto-merge (squash), GitHub merges them once the required checks
+    pass. A repo without auto-merge enabled, or without required checks, rejects the mutation and the PRs are left for
+    the next run.
+
+    Returns the number of PRs auto-merge was enabled on
+    """
+
+    if dry_run:
+        for pr in prs:
+            log.info("would enable auto-merge", pr=pr.html_url)
+
+        return len(prs)
+
+    enabled_count = 0
+
+    for batch in batched(prs, MERGE_BATCH_SIZE):
+        declarations = []
+        selections = []
+        variables = {}
+
+        for index, pr in enumerate(batch):
+            declarations.append(f"$pr{index}: ID!, $head{index}: GitObjectID!")
+            selections.append(
+                f"{alias(index)}: enablePullRequestAutoMerge(input: {{pullRequestId: $pr{index}, "
+                f"mergeMethod: SQUASH, expectedHeadOid: $head{index}}}) {{ clientMutationId }}"
+            )
+            variables[f"pr{index}"] = pr.node_id
+            variables[f"head{index}"] = pr.head.sha
+
+        query = f"mutation({', '.join(declarations)}) {{ {' '.join(selections)} }}"
+
+        try:
+            response = graphql_request(batch[0]._requester, query, variables)
+        except GithubException as e:
+            log.warning("failed to enable auto-merge", count=len(batch), error=str(e))
+            continue
+
+        errors = errors_by_alias(response)
+        enabled = []
+
+        for index, pr in enumerate(batch):
+            if error := errors.get(alias(index)):
+                log.info("could not enable auto-merge", pr=pr.html_url, error=error)
+                continue
+
+            log.info("enabled auto-merge", pr=pr.html_url)
+            checkpoint.record("pr_auto_merge_enabled", pr=pr.html_url)
+            enabled.append(pr)
+
+        if enabled:
+            bulk_comment(enabled, AUTO_MERGE_ENABLED_MESSAGE)
+
+        enabled_count += len(enabled)
+
+    return enabled_count
+
+
+def check_auto_merge_prs(prs: list[PullRequest]) -> None:
+    """
+    PRs which already have auto-merge enabled are merged by GitHub, they only need attention when CI failed or they
+    conflict. One request per batch for the combined CI state of every PR, instead of the status and check run
+    requests per PR.
+
+    Conflicts get the usual `handle_stale_dependabot_pr` treatment. Failed checks are only reported (logged and
+    recorded in the journal): auto-merge stays enabled, so a re-run which passes or a new push from Dependabot still
+    merges the PR without another evaluation.
+    """
+
+    for batch in batched(prs):
+        declarations = []
+        selections = []
+        variables = {}
+
+        for index, pr in enumerate(batch):
+            declarations.append(f"$pr{index}: ID!")
+            selections.append(
+                f"{alias(index)}: node(id: $pr{index}) {{ ... on PullRequest {{ mergeable "
+                "commits(last: 1) { nodes { commit { statusCheckRollup { state } } } } } }"
+            )
+            variables[f"pr{index}"] = pr.node_id
+
+        query = f"query({', '.join(declarations)}) {{ {' '.join(selections)} }}"
+
+        try:
+            response = graphql_request(batch[0]._requester, query, variables)
+        except GithubException as e:
+            log.warning(
+                "failed to check auto-merge PRs", count=len(batch), error=str(e)
+            )
+            continue
+
+        data = response.get("data") or {}
+
+        for index, pr in enumerate(batch):
+            node = data.get(alias(index))
+
+            if node is None:
+                continue
+
+            commits = node["commits"]["nodes"]
+            rollup = commits[0]["commit"]["statusCheckRollup"] if commits else None
+            ci_state = rollup["state"] if rollup else None
+
+            if node["mergeable"] == "CONFLICTING":
+                log.info("auto-merge PR has conflicts", pr=pr.html_url)
+
+                # the REST payload is needed to decide how to handle the conflict
+                resolve_async_status(pr, "mergeable")
+
+                # GitHub may not have recomputed the state yet ("unknown"), left for the next run
+                if pr.mergeable is False and pr.mergeable_state == "dirty":
+                    handle_stale_dependabot_pr(pr)
+                else:
+                    log.info(
+                        "conflict not confirmed by GitHub yet, checking again next run",
+                        pr=pr.html_url,
+                        mergeable_state=pr.mergeable_state,
+                    )
+            elif ci_state in ("FAILURE", "ERROR"):
+                log.warning("auto-merge PR has failed checks", pr=pr.html_url)
+                checkpoint.record("pr_checks_failed", pr=pr.html_url)
+            else:
+                log.debug("waiting for auto-merge", pr=pr.html_url, ci_state=ci_state)
+
+
+def resolve_async_status(object, key):
+    """
+    https://github.com/PyGithub/PyGithub/issues/1979
+    """
+
+    count_limit = 10
+
+    with span("resolve_async_status", key=key):
+        while getattr(object, key) is None:
+            check_deadline()
+            time.sleep(1)
+
+            setattr(object, f"_{key}", NotSet)
+            object._CompletableGithubObject__completed = False
+
+            count_limit -= 1
+            if count_limit == 0:
+                return
+
+
+def handle_stale_dependabot_pr(pr: PullRequest) -> None:
+    """
+    Handle a dependabot PR that has been open for at least 30 days and has conflicts
+    """
+
+    assert not pr.mergeable
+    assert pr.mergeable_state == "dirty"
+
+    if pr.body is None:
+        return
+
+    if "Automatic rebases have been disabled on this pull request" in pr.body:
+        log.info(
+            "PR has disabled automatic rebases, manually commenting", url=pr.html_url
+        )
+
+        pr.create_issue_comment("@dependabot rebase")
+
+
+def is_dependabot_pr(pr: PullRequest) -> bool:
+    return pr.user.login == "dependabot[bot]"
+
+
+def is_allowed_by_policy(
+    pr: PullRequest,
+    policy: MergePolicy,
+    updates: list[UpdatedDependency] | None = None,
+) -> bool:
+    """
+    Cheap checks which only use the PR listing payload, run before anything that costs a request. Pass `updates` when
+    the PR was already parsed (`parse_pull_requests`).
+    """
+
+    if not is_dependabot_pr(pr):
+        log.debug("PR is not from dependabot", url=pr.html_url)
+        return False
+
+    if not policy.filters_updates:
+        return True
+
+    if updates is None:
+        updates = parse_pull_request(pr)
+
+    reason = policy.rejection_reason(updates)
+
+    if reason:
+        log.debug("PR rejected by merge policy", url=pr.html_url, reason=reason)
+        return False
+
+    return True
+
+
+def is_eligible_for_merge(
+    pr: PullRequest,
+    policy: MergePolicy = DEFAULT_MERGE_POLICY,
+    failure_cache: MergeFailureCache | None = None,
+):
+    return merge_readiness(pr, policy, failure_cache) == "ready"
+
+
+def merge_readiness(
+    pr: PullRequest,
+    policy: MergePolicy = DEFAULT_MERGE_POLICY,
+    failure_cache: MergeFailureCache | None = None,
+    updates: list[UpdatedDependency] | None = None,
+) -> MergeReadiness:
+    if not is_allowed_by_policy(pr, policy, updates):
+        return "blocked"
+
+    if failure_cache and failure_cache.should_skip(pr):
+        return "blocked"
+
+    resolve_async_status(pr, "mergeable")
+
+    if pr.state == "closed":
+        log.debug("PR is closed", url=pr.html_url)
+        return "blocked"
+
+    if not pr.mergeable:
+        log.debug("PR is not mergeable", url=pr.html_url)
+        handle_stale_dependabot_pr(pr)
+        return "blocked"
+
+    last_commit = pr.get_commits().reversed[0]
+    combined_status = last_commit.get_combined_status()
+    status = combined_status.state
+    has_statuses = len(combined_status.statuses) > 0
+
+    # status is different than CI runs!
+    if has_statuses and status not in ("success", "pending"):
+        log.debug("PR has failed status", url=pr.html_url, status=status)
+        return "blocked"
+
+    # checks are the CI runs, a check which is still running has no conclusion yet
+    conclusions = (
+        last_commit.get_check_runs() | fp.pluck_attr("conclusion") | fp.to_list()
+    )
+
+    if not all(
+        conclusion in {"success", "skipped", None} for conclusion in conclusions
+    ):
+        log.debug("PR has failed checks", url=pr.html_url)
+        return "blocked"
+
+    if (has_statuses and status == "pending") or None in conclusions:
+        log.debug("PR has pending checks", url=pr.html_url)
+        return "pending"
+
+    return "ready"
+
+
+def process_repo(
+    repo,
+    dry_run,
+    policy: MergePolicy = DEFAULT_MERGE_POLICY,
+    failure_cache: MergeFailureCache | None = None,
+    pr_numbers: t.Sequence[int] | None = None,
+) -> int:
+    """
+    Returns the number of merged PRs. Only the PRs in `pr_numbers` are evaluated when given (found by the Dependabot
+    search), instead of every open PR.
+    """
+
+    with (
+        log.context(repo=repo.full_name),
+        span("repo", command="dependabot", repo=repo.full_name),
+    ):
+        log.debug("checking repository")
+
+        if repo.fork:
+            log.debug("skipping forked repo")
+            return 0
+
+        # iterated directly, `totalCount` would cost an extra request per repo
+        eligible_prs = []
+        pending_prs = []
+        auto_merge_prs = []
+
+        if pr_numbers is None:
+            pulls = prefetch_pages(repo.get_pulls(state="open")) | fp.to_list()
+        else:
+            # a request per PR, but the full payload includes `mergeable`: a listed PR costs the same request later
+            pulls = [repo.get_pull(number) for number in pr_numbers]
+
+        # the metadata of every listed Dependabot PR in one pass, only needed when the policy looks at update types
+        updates = (
+            parse_pull_requests(pulls | fp.filter(is_dependabot_pr))
+            if policy.filters_updates
+            else {}
+        )
+
+        for pr in pulls:
+            with (
+                span("pr", url=pr.html_url),
+                checkpoint.deferrable("pr", PR_DEADLINE_SECONDS, pr=pr.html_url),
+            ):
+                # part of the listing payload, GitHub is already waiting for CI on this one
+                if policy.auto_merge and pr.auto_merge:
+                    if is_allowed_by_policy(pr, policy, updates.get(pr.number)):
+                        auto_merge_prs.append(pr)
+
+                    continue
+
+                readiness = merge_readiness(
+                    pr, policy, failure_cache, updates.get(pr.number)
+                )
+
+                if readiness == "ready":
+                    eligible_prs.append(pr)
+                elif readiness == "pending" and policy.auto_merge:
+                    pending_prs.append(pr)
+                else:
+                    log.debug("skipping PR", url=pr.html_url)
+
+        # merged together once every PR was evaluated
+        merged_pr_count = merge_prs(eligible_prs, dry_run, failure_cache)
+
+        if pending_prs:
+            enable_auto_merge(pending_prs, dry_run)
+
+        if auto_merge_prs:
+            check_auto_merge_prs(auto_merge_prs)
+
+        if merged_pr_count == 0:
+            log.debug("no PRs were merged")
+        else:
+            log.info("merged prs", count=merged_pr_count)
+
+        return merged_pr_count
@@ -0,0 +1,192 @@
+"""
+Extract dependency update metadata from a Dependabot PR without any additional API calls.
+
+Port of `parse` from https://raw.githubusercontent.com/dependabot/fetch-metadata/main/src/dependabot/update_metadata.ts
+The alert and compatibility score lookups are intentionally dropped: they each cost a request per dependency.
+"""
+
+import re
+import typing as t
+
+from github.PullRequest import PullRequest
+
+BUMP_RE = re.compile(
+    r"^Bumps .* from (?P<from>v?\d[^ ]*) to (?P<to>v?\d[^ ]*)\.$", re.MULTILINE
+)
+UPDATE_RE = re.compile(
+    r"^Update .* requirement from \S*? ?(?P<from>v?\d\S*) to \S*? ?(?P<to>v?\d\S*)$",
+    re.MULTILINE,
+)
+YAML_RE = re.compile(r"-{3}\n(?P<dependencies>[\S|\s]*?)\n\.{3}\n", re.MULTILINE)
+GROUP_RE = re.compile(r"dependency-group:\s(?P<name>\S*)", re.MULTILINE)
+MAINTAINER_CHANGES_RE = re.compile(r"Maintainer changes", re.MULTILINE)
+
+# the PR title/commit subject, e.g. "Bump requests from 2.31.0 to 2.32.0 in /docs"
+TITLE_RE = re.compile(
+    r"^(?:\S+: )?(?:[Bb]ump|[Uu]pdate) (?P<name>\S+) (?:requirement )?from",
+    re.MULTILINE,
+)
+# grouped updates list every dependency in the body: "Updates `requests` from 2.31.0 to 2.32.0"
+GROUPED_UPDATE_RE = re.compile(
+    r"^Updates `(?P<name>[^`]+)` from (?P<from>v?\d\S*) to (?P<to>v?\d\S*)",
+    re.MULTILINE,
+)
+YAML_ENTRY_RE = re.compile(r"^\s*(?P<item>- )?(?P<key>[\w-]+):\s*(?P<value>.*)$")
+
+
+class UpdatedDependency(t.TypedDict, total=False):
+    dependencyName: str
+    dependencyType: str
+    updateType: str
+    directory: str
+    packageEcosystem: str
+    targetBranch: str
+    prevVersion: str
+    newVersion: str
+    maintainerChanges: bool
+    dependencyGroup: str
+
+
+def parse(
+    commit_message: str, body: str, branch_name: str, main_branch: str
+) -> list[UpdatedDependency]:
+    """
+    Parse the commit message (or PR title + body) and branch name of a Dependabot update.
+
+    Commit messages contain a YAML block with `updated-dependencies`, PR bodies do not: in that case the dependencies
+    are inferred from the "Bumps ..." / "Updates `...`" lines instead.
+    """
+
+    # the character after "dependabot" is the branch delimiter
+    if not branch_name.startswith("dependabot") or len(branch_name) <= 10:
+        return []
+
+    bump_match = BUMP_RE.search(commit_message)
+    update_match = UPDATE_RE.search(commit_message)
+    yaml_match = YAML_RE.search(commit_message)
+    group_match = GROUP_RE.search(commit_message)
+
+    new_maintainer = bool(MAINTAINER_CHANGES_RE.search(body or ""))
+
+    # dependabot/<ecosystem>/<directory...>/<dependency>-<version>, the delimiter is configurable
+    delim = branch_name[10]
+    chunks = branch_name.split(delim)
+    ecosystem = chunks[1] if len(chunks) > 1 else ""
+
+    version_match = bump_match or update_match
+    prev = version_match.group("from") if version_match else ""
+    next = version_match.group("to") if version_match else ""
+    dependency_group = group_match.group("name") if group_match else ""
+
+    def create_dependency(
+        name: str,
+        dependency_type: str,
+        last_version: str,
+        next_version: str,
+        update_type: str | None = None,
+    ) -> UpdatedDependency:
+        dirname = f"/{'/'.join(chunks[2:-1 * (1 + name.count('/'))]) or ''}"
+
+        return UpdatedDependency(
+            dependencyName=name,
+            dependencyType=dependency_type,
+            updateType=update_type or calculate_update_type(last_version, next_version),
+            directory=dirname,
+            packageEcosystem=ecosystem,
+            targetBranch=main_branch,
+            prevVersion=last_version,
+            newVersion=next_version,
+            maintainerChanges=new_maintainer,
+            dependencyGroup=dependency_group,
+        )
+
+    if yaml_match:
+        dependencies = parse_updated_dependencies(yaml_match.group("dependencies"))
+
+        return [
+            create_dependency(
+                dependency["dependency-name"],
+                dependency.get("dependency-type", ""),
+                prev if index == 0 else "",
+                next if index == 0 else "",
+                dependency.get("update-type"),
+            )
+            for index, dependency in enumerate(dependencies)
+        ]
+
+    if grouped_updates := GROUPED_UPDATE_RE.findall(body or ""):
+        return [
+            create_dependency(name, "", last_version, next_version.rstrip("."))
+            for name, last_version, next_version in grouped_updates
+        ]
+
+    if version_match and (title_match := TITLE_RE.search(commit_message)):
+        return [create_dependency(title_match.group("name"), "", prev, next)]
+
+    return []
+
+
+def parse_updated_dependencies(yaml_block: str) -> list[dict[str, str]]:
+    """
+    Minimal parser for the fixed-shape YAML dependabot writes, avoids a yaml dependency:
+
+        updated-dependencies:
+        - dependency-name: requests
+          dependency-type: direct:production
+          update-type: version-update:semver-minor
+    """
+
+    dependencies: list[dict[str, str]] = []
+
+    for line in yaml_block.splitlines():
+        match = YAML_ENTRY_RE.match(line)
+
+        if not match or match.group("key") == "updated-dependencies":
+            continue
+
+        if match.group("item"):
+            dependencies.append({})
+
+        if dependencies:
+            dependencies[-1][match.group("key")] = match.group("value").strip("'\"")
+
+    return [
+        dependency for dependency in dependencies if "dependency-name" in dependency
+    ]
+
+
+def calculate_update_type(last_version: str, next_version: str) -> str:
+    if not last_version or not next_version or last_version == next_version:
+        return ""
+
+    last_parts = last_version.lstrip("v").split(".")
+    next_parts = next_version.lstrip("v").split(".")
+
+    if last_parts[0] != next_parts[0]:
+        return "version-update:semver-major"
+    if len(last_parts) < 2 or len(next_parts) < 2 or last_parts[1] != next_parts[1]:
+        return "version-update:semver-minor"
+    return "version-update:semver-patch"
+
+
+def parse_pull_request(pr: PullRequest) -> list[UpdatedDependency]:
+    """
+    Only uses attributes included in the `GET /repos/{owner}/{repo}/pulls` listing, so this never triggers a request
+    """
+
+    return parse(
+        commit_message=f"{pr.title}\n\n{pr.body or ''}",
+        body=pr.body or "",
+        branch_name=pr.head.ref,
+        main_branch=pr.base.ref,
+    )
+
+
+def parse_pull_requests(
+    pulls: t.Iterable[PullRequest],
+) -> dict[int, list[UpdatedDependency]]:
+    """
+    Batch version of `parse_pull_request`, keyed by PR number
+    """
+
+    return {pr.number: parse_pull_request(pr) for pr in pulls}
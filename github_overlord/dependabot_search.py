@@ -0,0 +1,100 @@
+"""
+Find the repos with open Dependabot PRs with one paginated search, instead of listing every repo of the account.
+
+Each search page returns up to 100 PRs together with their repos (the `REPOSITORY_FIELDS` used for listings), so
+discovery costs a few requests in total no matter how many repos the account has. Only the repos with hits are
+processed afterwards, and the numbers of the PRs found are kept so only those PRs are fetched.
+"""
+
+import typing as t
+
+from github import Github
+from github.Repository import Repository
+
+from .deadlines import check_deadline
+from .graphql import REPOSITORY_FIELDS, graphql_request, repository_from_node
+from .utils import log
+
+# the search API never returns more than this many results for a query
+SEARCH_RESULT_LIMIT = 1000
+
+SEARCH_QUERY = f"""
+query($query: String!, $cursor: String) {{
+  search(query: $query, type: ISSUE, first: 100, after: $cursor) {{
+    issueCount
+    pageInfo {{ hasNextPage endCursor }}
+    nodes {{ ... on PullRequest {{ number repository {{ {REPOSITORY_FIELDS} }} }} }}
+  }}
+}}
+"""
+
+
+def dependabot_search_query(owners: t.Sequence[str]) -> str:
+    # several `user:` qualifiers match the repos of any of them, orgs included
+    users = " ".join(f"user:{owner}" for owner in owners)
+    return f"is:pr is:open author:app/dependabot {users} archived:false is:public"
+
+
+def search_dependabot_repos(
+    github: Github,
+    owners: t.Sequence[str],
+    pr_numbers: dict[str, list[int]] | None = None,
+) -> list[Repository]:
+    """
+    The repos of `owners` (users or orgs) with open Dependabot PRs, in the shape of a repo listing so `prefilter` can
+    be applied. The numbers of the PRs found are added to `pr_numbers`, by repo full name.
+    """
+
+    variables: dict[str, t.Any] = {
+        "query": dependabot_search_query(owners),
+        "cursor": None,
+    }
+    repos: dict[str, Repository] = {}
+    pr_count = 0
+
+    while True:
+        check_deadline()
+
+        response = graphql_request(github.requester, SEARCH_QUERY, variables)
+        errors = [error.get("message") for error in response.get("errors") or []]
+        search = (response.get("data") or {}).get("search")
+
+        # rate limits and search timeouts come back as errors without data, a partial listing would look complete
+        if search is None:
+            log.error("dependabot search failed", errors=errors)
+            raise RuntimeError(
+                f"dependabot search failed: {'; '.join(map(str, errors))}"
+            )
+
+        if errors:
+            log.warning("dependabot search returned errors", errors=errors)
+
+        for node in search["nodes"]:
+            # results which are not PRs come back as empty nodes
+            if not node:
+                continue
+
+            pr_count += 1
+            repo = node["repository"]
+
+            if repo["nameWithOwner"] not in repos:
+                repos[repo["nameWithOwner"]] = repository_from_node(github, repo)
+
+            if pr_numbers is not None:
+                pr_numbers.setdefault(repo["nameWithOwner"], []).append(node["number"])
+
+        if not search["pageInfo"]["hasNextPage"]:
+            break
+
+        variables["cursor"] = search["pageInfo"]["endCursor"]
+
+    if search["issueCount"] > SEARCH_RESULT_LIMIT:
+        log.warning(
+            "dependabot search results are truncated, the remaining PRs are found once these are merged",
+            total=search["issueCount"],
+            limit=SEARCH_RESULT_LIMIT,
+        )
+
+    log.info("found dependabot PRs", prs=pr_count, repos=len(repos))
+
+    return list(repos.values())
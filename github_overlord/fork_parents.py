@@ -0,0 +1,127 @@
+"""
+Persistent fork -> parent mapping for keep-alive-prs. Reading `repo.parent` on a listed fork fetches the whole fork,
+one request per fork on every run, although the parent of a fork almost never changes.
+
+Unknown or expired forks are resolved in bulk through GraphQL (`parent { nameWithOwner }`), and the upstream repos
+are then fetched in bulk as well, each one once no matter how many forks point at it.
+"""
+
+import time
+import typing as t
+
+from github import Github
+from github.Repository import Repository
+
+from .graphql import fetch_repositories, query_repositories
+from .state import read_state, state_path, update_state
+from .utils import log
+
+ENTRY_TTL_SECONDS = 30 * 24 * 60 * 60
+
+
+class ForkParentCache:
+    def __init__(self, path=None):
+        self.path = path or state_path("fork-parents.json")
+        self.entries: dict[str, dict] = read_state(self.path)
+        self._dirty: dict[str, dict] = {}
+
+    def get(self, fork: str) -> dict | None:
+        entry = self.entries.get(fork)
+
+        if entry is None or time.time() - entry["resolved_at"] > ENTRY_TTL_SECONDS:
+            return None
+
+        return entry
+
+    def set(self, fork: str, parent: str | None) -> None:
+        entry = {"parent": parent, "resolved_at": time.time()}
+        self.entries[fork] = entry
+        self._dirty[fork] = entry
+
+    def save(self) -> None:
+        if not self._dirty:
+            return
+
+        self.entries = update_state(self.path, self._merge)
+        self._dirty = {}
+
+    def _merge(self, entries: dict[str, t.Any]) -> dict[str, t.Any]:
+        # other processes may have written since we read, only our own changes are applied
+        now = time.time()
+
+        return {
+            fork: entry
+            for fork, entry in (entries | self._dirty).items()
+            if now - entry["resolved_at"] <= ENTRY_TTL_SECONDS
+        }
+
+
+def resolve_fork_parents(
+    github: Github, forks: list[str], cache: ForkParentCache
+) -> dict[str, str | None]:
+    """
+    Map each fork to the full name of its parent, None if the fork was detached or is gone. Forks which could not be
+    looked up are left out, and neither cached nor treated as detached, so the next run tries them again.
+    """
+
+    parents = {}
+    unresolved = []
+
+    for fork in forks:
+        if entry := cache.get(fork):
+            parents[fork] = entry["parent"]
+        else:
+            unresolved.append(fork)
+
+    log.debug(
+        "resolving fork parents",
+        cached=len(parents),
+        unresolved=len(unresolved),
+    )
+
+    for fork, node in query_repositories(
+        github, unresolved, "parent { nameWithOwner }"
+    ):
+        parent = node["parent"]["nameWithOwner"] if node and node["parent"] else None
+        cache.set(fork, parent)
+        parents[fork] = parent
+
+    cache.save()
+    return parents
+
+
+def upstream_repos(
+    github: Github, repos: t.Iterable[Repository], login: str
+) -> list[Repository]:
+    """
+    Replace forks with their parents and drop repos owned by `login`, every upstream repo is returned once
+    """
+
+    listed = list(repos)
+    forks = [repo.full_name for repo in listed if repo.fork]
+    parents = resolve_fork_parents(github, forks, ForkParentCache())
+
+    upstream = {
+        repo.full_name: repo
+        for repo in listed
+        if not repo.fork and repo.owner.login != login
+    }
+
+    parent_names = {
+        parent
+        for parent in parents.values()
+        if parent is not None
+        and parent not in upstream
+        and parent.split("/", 1)[0] != login
+    }
+
+    log.debug(
+        "resolved upstream repos",
+        forks=len(forks),
+        parents=len(parent_names),
+    )
+
+    for repo in fetch_repositories(github, sorted(parent_names)):
+        upstream[repo.full_name] = repo
+
+    return list(upstream.values())
@@ -0,0 +1,179 @@
+"""
+Helpers for batching many lookups or mutations into a single GraphQL request using aliases (`r0: repository(...)`).
+
+PyGithub's `graphql_query` raises when any part of the response has an error, which would throw away every other
+aliased result. These helpers return partial data and the errors instead.
+"""
+
+import typing as t
+from itertools import islice
+
+from github import Github
+from github.Repository import Repository
+from github.Requester import Requester
+
+from .utils import log
+
+# GitHub limits the complexity of a single query, this stays well below it for the queries used here
+DEFAULT_BATCH_SIZE = 50
+
+# the subset of REST listing fields the repo commands (and `repo_filter`) read, as GraphQL fields
+REPOSITORY_FIELDS = """
+nameWithOwner
+name
+owner { login }
+url
+isArchived
+isFork
+diskUsage
+pushedAt
+issues(states: OPEN) { totalCount }
+pullRequests(states: OPEN) { totalCount }
+"""
+
+T = t.TypeVar("T")
+
+
+def batched(
+    items: t.Iterable[T], size: int = DEFAULT_BATCH_SIZE
+) -> t.Iterator[list[T]]:
+    iterator = iter(items)
+
+    while batch := list(islice(iterator, size)):
+        yield batch
+
+
+def alias(index: int) -> str:
+    return f"r{index}"
+
+
+def graphql_request(requester: Requester, query: str, variables: dict) -> dict:
+    """
+    Returns the raw response, `data` and `errors` can both be present
+    """
+
+    _headers, response = requester.requestJsonAndCheck(
+        "POST", requester.graphql_url, input={"query": query, "variables": variables}
+    )
+    return response
+
+
+def errors_by_alias(response: dict) -> dict[str, str]:
+    """
+    Map the alias of each failed field to its error message
+    """
+
+    return {
+        error["path"][0]: error.get("message", "unknown error")
+        for error in response.get("errors") or []
+        if error.get("path")
+    }
+
+
+def not_found_aliases(response: dict) -> set[str]:
+    """
+    Aliases which failed because the object does not exist or is not accessible, as opposed to rate limits or timeouts
+    """
+
+    return {
+        error["path"][0]
+        for error in response.get("errors") or []
+        if error.get("path") and error.get("type") == "NOT_FOUND"
+    }
+
+
+def query_repositories(
+    github: Github, full_names: list[str], fields: str
+) -> t.Iterator[tuple[str, dict | None]]:
+    """
+    Look up `fields` for many repos, one request per batch. Yields `(full_name, node)`, the node is None for repos
+    which do not exist or are not accessible.
+
+    Repos whose lookup failed for any other reason (rate limits, timeouts) are not yielded at all, so callers cannot
+    mistake them for missing repos.
+    """
+
+    for batch in batched(full_names):
+        declarations = []
+        selections = []
+        variables = {}
+
+        for index, full_name in enumerate(batch):
+            owner, name = full_name.split("/", 1)
+            variables[f"owner{index}"] = owner
+            variables[f"name{index}"] = name
+            declarations.append(f"$owner{index}: String!, $name{index}: String!")
+            selections.append(
+                f"{alias(index)}: repository(owner: $owner{index}, name: $name{index}) {{ {fields} }}"
+            )
+
+        query = f"query({', '.join(declarations)}) {{ {' '.join(selections)} }}"
+        response = graphql_request(github.requester, query, variables)
+        data = response.get("data")
+
+        if data is None:
+            log.warning(
+                "failed to look up repositories",
+                count=len(batch),
+                errors=[error.get("message") for error in response.get("errors") or []],
+            )
+            continue
+
+        errors = errors_by_alias(response)
+        not_found = not_found_aliases(response)
+
+        for index, full_name in enumerate(batch):
+            repo_alias = alias(index)
+
+            if repo_alias in errors and repo_alias not in not_found:
+                log.warning(
+                    "failed to look up repository",
+                    repo=full_name,
+                    error=errors[repo_alias],
+                )
+                continue
+
+            yield full_name, data.get(repo_alias)
+
+
+def repository_from_node(github: Github, node: dict) -> Repository:
+    """
+    Build a `Repository` from a `REPOSITORY_FIELDS` node, shaped like a REST listing entry so it can be used without
+    triggering a fetch
+    """
+
+    requester = github.requester
+    attributes = {
+        "full_name": node["nameWithOwner"],
+        "name": node["name"],
+        "owner": {"login": node["owner"]["login"]},
+        "url": f"{requester.base_url}/repos/{node['nameWithOwner']}",
+        "html_url": node["url"],
+        "archived": node["isArchived"],
+        "fork": node["isFork"],
+        # unknown for some repos, None keeps `prefilter` from mistaking them for empty repos
+        "size": node["diskUsage"],
+        "pushed_at": node["pushedAt"],
+        # like the REST field, open PRs are counted as issues
+        "open_issues_count": node["issues"]["totalCount"]
+        + node["pullRequests"]["totalCount"],
+    }
+
+    return Repository(requester, {}, attributes, False)
+
+
+def fetch_repositories(github: Github, full_names: list[str]) -> list[Repository]:
+    """
+    Fetch many repos in bulk, instead of one `get_repo` request each. Inaccessible repos are left out.
+    """
+
+    repos = []
+
+    for full_name, node in query_repositories(github, full_names, REPOSITORY_FIELDS):
+        if node is None:
+            log.warning("repository not found", repo=full_name)
+            continue
+
+        repos.append(repository_from_node(github, node))
+
+    return repos
@@ -0,0 +1,41 @@
+import importlib
+
+import click
+
+
+class LazyGroup(click.Group):
+    """
+    Click group which only imports a subcommand's module when that subcommand is resolved. Some commands pull in heavy
+    LLM SDKs, and a single command run from a short-lived job should not pay for all of them.
+
+    https://click.palletsprojects.com/en/stable/complex/#lazily-loading-subcommands
+    """
+
+    def __init__(self, *args, lazy_subcommands: dict[str, str] | None = None, **kwargs):
+        super().__init__(*args, **kwargs)
+
+        # command name => "module.path:command_object"
+        self.lazy_subcommands = lazy_subcommands or {}
+
+    def list_commands(self, ctx):
+        return sorted(super().list_commands(ctx) + list(self.lazy_subcommands))
+
+    def get_command(self, ctx, cmd_name):
+        if cmd_name in self.lazy_subcommands:
+            return self._lazy_load(cmd_name)
+
+        return super().get_command(ctx, cmd_name)
+
+    def _lazy_load(self, cmd_name):
+        import_path = self.lazy_subcommands[cmd_name]
+        module_name, command_object_name = import_path.split(":", 1)
+
+        module = importlib.import_module(module_name)
+        command = getattr(module, command_object_name)
+
+        if not isinstance(command, click.Command):
+            raise ValueError(
+                f"lazy loading of {import_path} failed by returning a non-command object"
+            )
+
+        return command
@@ -0,0 +1,214 @@
+"""
+Queue-backed structlog sink. Log calls only enqueue the event dict, a background thread renders and writes batches.
+
+Keep this module free of imports from the rest of the package: it is loaded by `utils` before anything else.
+"""
+
+import atexit
+import itertools
+import queue
+import threading
+import typing as t
+
+import structlog
+
+# marker used to tell the writer thread to drain and exit
+_SHUTDOWN = object()
+
+Renderer = t.Callable[[t.Any, str, dict], str]
+
+
+class BatchedLogWriter:
+    """
+    Drain rendered log lines from a queue on a daemon thread, writing (and flushing) them in batches.
+
+    If the queue is full the event is dropped instead of blocking the caller, the number of dropped events is reported
+    on the next batch.
+    """
+
+    def __init__(
+        self,
+        file: t.TextIO,
+        renderer: Renderer,
+        batch_size: int = 256,
+        flush_interval: float = 0.5,
+        max_queue_size: int = 10_000,
+    ):
+        self.file = file
+        self.renderer = renderer
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.dropped = 0
+
+        self._queue: queue.Queue = queue.Queue(maxsize=max_queue_size)
+        self._thread = threading.Thread(
+            target=self._run, name="github-overlord-log-writer", daemon=True
+        )
+        self._thread.start()
+
+        atexit.register(self.close)
+
+    def put(self, method_name: str, event_dict: dict) -> None:
+        try:
+            self._queue.put_nowait((method_name, event_dict))
+        except queue.Full:
+            self.dropped += 1
+
+    def flush(self) -> None:
+        """
+        Block until everything enqueued so far is written. Needed in worker processes, which exit without atexit.
+        """
+
+        if self._thread.is_alive():
+            self._queue.join()
+
+    def close(self) -> None:
+        if not self._thread.is_alive():
+            return
+
+        self._queue.put(_SHUTDOWN)
+        self._thread.join()
+
+    def _run(self) -> None:
+        while True:
+            try:
+                item = self._queue.get(timeout=self.flush_interval)
+            except queue.Empty:
+                continue
+
+            batch = [item]
+
+            while len(batch) < self.batch_size:
+                try:
+                    batch.append(self._queue.get_nowait())
+                except queue.Empty:
+                    break
+
+            shutdown = _SHUTDOWN in batch
+
+            try:
+                self._write([entry for entry in batch if entry is not _SHUTDOWN])
+            finally:
+                for _ in batch:
+                    self._queue.task_done()
+
+            if shutdown:
+                return
+
+    def _write(self, batch: list[tuple[str, dict]]) -> None:
+        lines = []
+
+        if self.dropped:
+            dropped, self.dropped = self.dropped, 0
+            lines.append(
+                self.renderer(
+                    None,
+                    "warning",
+                    {"event": "log queue full, dropped events", "count": dropped},
+                )
+            )
+
+        for method_name, event_dict in batch:
+            try:
+                lines.append(self.renderer(None, method_name, event_dict))
+            except Exception as e:  # pylint: disable=broad-except
+                lines.append(f"failed to render log event: {e!r} {event_dict!r}")
+
+        if not lines:
+            return
+
+        self.file.write("\n".join(lines) + "\n")
+        self.file.flush()
+
+
+class QueuedLogger:
+    """
+    structlog logger which hands the (unrendered) event dict to a `BatchedLogWriter`.
+
+    The last processor must return a dict, which structlog passes in as keyword arguments.
+    """
+
+    def __init__(self, writer: BatchedLogWriter):
+        self._writer = writer
+
+    def _proxy(self, method_name: str) -> t.Callable[..., None]:
+        def enqueue(**event_dict) -> None:
+            self._writer.put(method_name, event_dict)
+
+        return enqueue
+
+    def __getattr__(self, method_name: str) -> t.Callable[..., None]:
+        # cache the bound proxy so subsequent calls skip __getattr__
+        proxy = self._proxy(method_name)
+        setattr(self, method_name, proxy)
+        return proxy
+
+
+class QueuedLoggerFactory:
+    def __init__(self, writer: BatchedLogWriter):
+        self._logger = QueuedLogger(writer)
+
+    def __call__(self, *args) -> QueuedLogger:
+        return self._logger
+
+
+class DebugEventSampler:
+    """
+    Processor which only keeps one out of every `rate` debug events for the given event names, e.g. "skipping PR"
+    is logged for every single PR that is not merged and drowns out everything else at DEBUG.
+    """
+
+    def __init__(self, rate: int, events: t.Iterable[str]):
+        self.rate = rate
+        # itertools.count is atomic under the GIL, no lock is needed on the hot path
+        self._counters = {event: itertools.count() for event in events}
+
+    def __call__(self, logger, method_name: str, event_dict: dict) -> dict:
+        if method_name != "debug" or self.rate <= 1:
+            return event_dict
+
+        counter = self._counters.get(event_dict.get("event"))  # type: ignore
+
+        if counter is not None and next(counter) % self.rate != 0:
+            raise structlog.DropEvent
+
+        return event_dict
+
+
+def pass_event_dict(logger, method_name: str, event_dict: dict) -> dict:
+    """
+    Final processor: rendering is deferred to the writer thread
+    """
+
+    return event_dict
+
+
+def build_renderer(log_format: str, log_file: t.TextIO) -> Renderer:
+    if log_format == "json":
+        return structlog.processors.JSONRenderer(default=str, sort_keys=False)
+
+    # no escape codes in PYTHON_LOG_PATH or piped output
+    return structlog.dev.ConsoleRenderer(colors=log_file.isatty())
+
+
+def queued_processors(
+    sample_rate: int, sampled_events: t.Iterable[str]
+) -> list[structlog.typing.Processor]:
+    """
+    Processors which run on the caller thread, everything expensive happens in `BatchedLogWriter`
+    """
+
+    processors: list[structlog.typing.Processor] = []
+
+    if sample_rate > 1:
+        processors.append(DebugEventSampler(sample_rate, sampled_events))
+
+    processors += [
+        structlog.contextvars.merge_contextvars,
+        structlog.processors.add_log_level,
+        structlog.processors.TimeStamper(fmt="iso", utc=True),
+        structlog.processors.format_exc_info,
+        pass_event_dict,
+    ]
+
+    return processors
@@ -0,0 +1,160 @@
+"""
+Persistent cache of PRs which could not be merged, e.g. Dependabot PRs touching `.github/workflows/*` fail with a 403
+when the token lacks the `workflow` scope. Without this, every run re-evaluates (status + check-run requests) and fails
+again.
+
+Entries are keyed by repo + PR number and only match while the head SHA and the token scopes are unchanged: a new push
+or a token with more scopes gets another attempt.
+"""
+
+import re
+import time
+import typing as t
+
+from github import GithubException, RateLimitExceededException
+from github.PullRequest import PullRequest
+
+from .state import read_state, state_path, update_state
+from .utils import log
+
+# failures which retrying with the same head SHA and token will not fix, by status. GitHub also answers 403 for its
+# secondary rate limits and 405 for transient conditions ("Base branch was modified", required checks which are still
+# pending), so only these messages are permanent
+PERMANENT_FAILURE_RES = {
+    # missing token scopes and permissions
+    403: re.compile(
+        r"workflow|not accessible by|permission|must have (?:admin|push|write)",
+        re.IGNORECASE,
+    ),
+    # repository rules
+    405: re.compile(
+        r"workflow|merge method|merges are not allowed|not allowed on this repository",
+        re.IGNORECASE,
+    ),
+}
+RATE_LIMIT_RE = re.compile(r"rate limit", re.IGNORECASE)
+
+# forget entries eventually, in case a repo setting changed
+ENTRY_TTL_SECONDS = 90 * 24 * 60 * 60
+
+
+class MergeFailureCache:
+    def __init__(self, token_scopes: list[str] | None, path=None):
+        self.path = path or state_path("merge-failures.json")
+        self.token_scopes = sorted(token_scopes) if token_scopes is not None else None
+        self.entries: dict[str, dict] = read_state(self.path)
+        # PRs skipped during this run because of a cached failure
+        self.skipped: list[dict] = []
+        self._dirty: dict[str, dict | None] = {}
+
+    @staticmethod
+    def key(pr: PullRequest) -> str:
+        return f"{pr.base.repo.full_name}#{pr.number}"
+
+    def lookup(self, pr: PullRequest) -> dict | None:
+        """
+        Only uses the PR listing payload (head SHA), never triggers a request
+        """
+
+        entry = self.entries.get(self.key(pr))
+
+        if entry is None:
+            return None
+
+        if (
+            entry["head_sha"] != pr.head.sha
+            or entry["token_scopes"] != self.token_scopes
+        ):
+            return None
+
+        if time.time() - entry["recorded_at"] > ENTRY_TTL_SECONDS:
+            return None
+
+        return entry
+
+    def should_skip(self, pr: PullRequest) -> bool:
+        entry = self.lookup(pr)
+
+        if entry is None:
+            return False
+
+        log.debug(
+            "PR failed to merge before, skipping", url=pr.html_url, cause=entry["cause"]
+        )
+        self.skipped.append({"url": pr.html_url, "cause": entry["cause"]})
+        return True
+
+    def record(self, pr: PullRequest, error: GithubException) -> bool:
+        """
+        Returns True if the failure is cacheable and was recorded
+        """
+
+        message = error.data.get("message") if isinstance(error.data, dict) else None
+
+        if not is_permanent_failure(error, message or str(error)):
+            return False
+
+        self._set(
+            self.key(pr),
+            {
+                "url": pr.html_url,
+                "head_sha": pr.head.sha,
+                "status": error.status,
+                "cause": message or str(error),
+                "token_scopes": self.token_scopes,
+                "recorded_at": time.time(),
+            },
+        )
+        return True
+
+    def forget(self, pr: PullRequest) -> None:
+        if self.key(pr) in self.entries:
+            self._set(self.key(pr), None)
+
+    def save(self) -> None:
+        if not self._dirty:
+            return
+
+        self.entries = update_state(self.path, self._merge)
+        self._dirty = {}
+
+    def _merge(self, entries: dict[str, t.Any]) -> dict[str, t.Any]:
+        # other processes may have written since we read, only our own changes are applied
+        for key, entry in self._dirty.items():
+            if entry is None:
+                entries.pop(key, None)
+            else:
+                entries[key] = entry
+
+        now = time.time()
+
+        return {
+            key: entry
+            for key, entry in entries.items()
+            if now - entry["recorded_at"] <= ENTRY_TTL_SECONDS
+        }
+
+    def log_summary(self) -> None:
+        if not self.skipped:
+            return
+
+        log.info("skipped PRs which failed to merge before", count=len(self.skipped))
+
+        for skipped in self.skipped:
+            log.info("skipped unmergeable PR", **skipped)
+
+    def _set(self, key: str, entry: dict | None) -> None:
+        self._dirty[key] = entry
+
+        if entry is None:
+            self.entries.pop(key, None)
+        else:
+            self.entries[key] = entry
+
+
+def is_permanent_failure(error: GithubException, message: str) -> bool:
+    if isinstance(error, RateLimitExceededException) or RATE_LIMIT_RE.search(message):
+        return False
+
+    pattern = PERMANENT_FAILURE_RES.get(error.status)
+    return bool(pattern and pattern.search(message))
@@ -0,0 +1,212 @@
+"""
+Rules for marking notifications as done, and a long running watcher which applies them as notifications arrive.
+
+The watcher polls `GET /notifications` with `If-Modified-Since` and waits `X-Poll-Interval` seconds between polls, as
+GitHub asks API clients to. An unchanged inbox is answered with a `304`, which does not count against the rate limit.
+When something changed, only threads which were not seen before (or were updated since) are processed.
+"""
+
+import time
+import typing as t
+from collections import Counter, OrderedDict
+
+from github import Github, GithubException
+from github.Notification import Notification
+
+import github_overlord.patch as _
+
+from .deadlines import DeadlineExceeded, remaining_seconds
+from .pagination import parse_link_header
+from .utils import log
+
+DONE_REASONS = {
+    "release": "marked releases as done",
+    "dependabot": "marked dependabot PRs as done",
+    "owned_closed_pull_request": "marked owned closed PRs as done",
+}
+
+# GitHub's default when the header is missing, it may ask for longer intervals under load
+DEFAULT_POLL_INTERVAL_SECONDS = 60
+
+# threads remembered by the watcher, the oldest are forgotten first
+MAX_SEEN_THREADS = 5000
+
+
+def done_reason(notification: Notification, login: str) -> str | None:
+    """
+    Why the notification can be marked as done, None if it should stay in the inbox:
+
+    * Releases on repos I own
+    * Dependabot pull requests
+    * Closed (merged, closed) pull requests that I authored
+    """
+
+    if (
+        notification.subject.type == "Release"
+        and notification.repository.owner.login == login
+    ):
+        return "release"
+
+    if notification.subject.type != "PullRequest":
+        return None
+
+    # TODO github digest has some logic to detect bots, maybe we can use that
+    pull_request = notification.get_pull_request()
+
+    if pull_request.user.login == "dependabot[bot]":
+        return "dependabot"
+
+    # PRs that I did not author may still be interesting
+    if notification.reason == "author" and pull_request.state != "open":
+        return "owned_closed_pull_request"
+
+    return None
+
+
+def clean_notifications(
+    notifications: t.Iterable[Notification], login: str, dry_run: bool
+) -> Counter:
+    """
+    Mark every notification matching a rule as done. Returns the number marked per reason.
+    """
+
+    marked: Counter = Counter()
+
+    for notification in notifications:
+        reason = done_reason(notification, login)
+
+        if reason is None:
+            continue
+
+        log.debug(
+            "marking notification as done",
+            reason=reason,
+            repo=notification.repository.full_name,
+            title=notification.subject.title,
+        )
+
+        if not dry_run:
+            notification.mark_as_done()
+
+        marked[reason] += 1
+
+    return marked
+
+
+class NotificationPoller:
+    def __init__(self, github: Github, include_read: bool):
+        self.requester = github.requester
+        self.parameters = {"all": "true" if include_read else "false", "per_page": 50}
+        self.last_modified: str | None = None
+        self.poll_interval = DEFAULT_POLL_INTERVAL_SECONDS
+        # thread id => updated_at of the version which was processed
+        self.seen: OrderedDict[str, str] = OrderedDict()
+        # updated_at of the threads returned by the last poll, as listed
+        self._listed: dict[str, str] = {}
+
+    def poll(self) -> list[Notification]:
+        """
+        New or updated threads since the last poll, empty if the inbox did not change
+        """
+
+        headers = (
+            {"If-Modified-Since": self.last_modified} if self.last_modified else {}
+        )
+        response_headers, data = self.requester.requestJsonAndCheck(
+            "GET", "/notifications", parameters=self.parameters, headers=headers
+        )
+
+        self.poll_interval = int(
+            response_headers.get("x-poll-interval", DEFAULT_POLL_INTERVAL_SECONDS)
+        )
+        self.last_modified = response_headers.get("last-modified", self.last_modified)
+
+        self._listed = {}
+
+        if not data:
+            # 304 Not Modified, or an empty inbox
+            return []
+
+        page_threads = self._unseen(response_headers, data)
+        new_threads = list(page_threads)
+
+        # newest threads come first, once a page contains a thread seen before the rest of the inbox was seen too
+        while len(page_threads) == len(data) and (
+            next_url := parse_link_header(response_headers).get("next")
+        ):
+            response_headers, data = self.requester.requestJsonAndCheck("GET", next_url)
+            page_threads = self._unseen(response_headers, data)
+            new_threads += page_threads
+
+        return new_threads
+
+    def _unseen(self, headers: dict, data: list[dict]) -> list[Notification]:
+        threads = []
+
+        for attributes in data:
+            if self.seen.get(attributes["id"]) == attributes["updated_at"]:
+                continue
+
+            self._listed[attributes["id"]] = attributes["updated_at"]
+            threads.append(Notification(self.requester, headers, attributes))
+
+        return threads
+
+    def mark_seen(self, notification: Notification) -> None:
+        self.seen[notification.id] = self._listed.pop(notification.id)
+        self.seen.move_to_end(notification.id)
+
+        while len(self.seen) > MAX_SEEN_THREADS:
+            self.seen.popitem(last=False)
+
+
+def watch_notifications(
+    github: Github,
+    login: str,
+    include_read: bool,
+    dry_run: bool,
+    min_interval: float,
+) -> None:
+    """
+    Poll for new notifications and clean them until interrupted or a deadline passes
+    """
+
+    poller = NotificationPoller(github, include_read)
+
+    log.info("watching notifications", include_read=include_read)
+
+    try:
+        while True:
+            try:
+                notifications = poller.poll()
+            except GithubException as e:
+                if e.status in (401, 403):
+                    raise
+
+                log.warning(
+                    "failed to poll notifications", status=e.status, error=str(e)
+                )
+                notifications = []
+
+            if notifications:
+                try:
+                    marked = clean_notifications(notifications, login, dry_run)
+                except GithubException as e:
+                    # not marked as seen, retried once the inbox changes again
+                    log.warning("failed to clean notifications", error=str(e))
+                    marked = Counter()
+                else:
+                    for notification in notifications:
+                        poller.mark_seen(notification)
+
+                log.info(
+                    "processed new notifications",
+                    count=len(notifications),
+                    **{reason: marked[reason] for reason in DONE_REASONS},
+                )
+
+            interval = max(poller.poll_interval, min_interval)
+            log.debug("waiting for next poll", seconds=interval)
+            time.sleep(max(remaining_seconds(interval), 0))
+    except DeadlineExceeded as e:
+        log.info("stopped watching notifications", scope=e.scope)
@@ -0,0 +1,154 @@
+"""
+Concurrent page prefetching for PyGithub's `PaginatedList`, which fetches one page at a time while iterating.
+
+The first page is requested as usual. Its `Link: rel="last"` header says how many pages there are, the remaining pages
+are then fetched by a thread pool with a bounded number of requests in flight while items are yielded in order. For a
+listing with many pages the wall time is close to a few page latencies instead of the sum of all of them.
+"""
+
+import contextvars
+import copy
+import threading
+import typing as t
+from collections import deque
+from concurrent.futures import Future, ThreadPoolExecutor
+
+from decouple import config
+from github.PaginatedList import PaginatedList
+from github.Requester import Requester
+
+from .deadlines import check_deadline
+from .utils import log
+
+T = t.TypeVar("T")
+
+# pages requested concurrently, 1 disables prefetching
+PAGE_PREFETCH_WINDOW = t.cast(
+    int, config("GITHUB_OVERLORD_PAGE_PREFETCH", default=4, cast=int)
+)
+
+
+def parse_link_header(headers: dict) -> dict[str, str]:
+    links = {}
+
+    for link in str(headers.get("link", "")).split(", "):
+        url, _, rel = link.partition("; ")
+
+        if rel.startswith('rel="'):
+            links[rel[5:-1]] = url[1:-1]
+
+    return links
+
+
+def last_page_number(headers: dict) -> int | None:
+    """
+    None if the listing has a single page or is paginated with cursors instead of page numbers
+    """
+
+    last_url = parse_link_header(headers).get("last")
+
+    if last_url is None:
+        return None
+
+    pages = Requester.get_parameters_of_url(last_url).get("page")
+    return int(pages[0]) if pages else None
+
+
+def prefetch_pages(
+    paginated: PaginatedList[T], window: int = PAGE_PREFETCH_WINDOW
+) -> t.Iterator[T]:
+    """
+    Iterate `paginated` like a regular `for` loop would, fetching up to `window` pages concurrently.
+
+    Falls back to PyGithub's sequential iteration for GraphQL and reversed lists, cursor paginated listings are
+    followed page by page. Active deadlines are checked before every page.
+    """
+
+    # there is no public API for the request a paginated list makes, these attributes are stable across PyGithub 2.x
+    requester: Requester = paginated._PaginatedList__requester  # type: ignore
+    first_url: str | None = paginated._PaginatedList__firstUrl  # type: ignore
+    first_params: dict = paginated._PaginatedList__firstParams  # type: ignore
+    request_headers: dict | None = paginated._PaginatedList__headers  # type: ignore
+    list_item: str = paginated._PaginatedList__list_item  # type: ignore
+    content_class = paginated._PaginatedList__contentClass  # type: ignore
+
+    if window <= 1 or first_url is None or paginated._reversed:
+        yield from paginated
+        return
+
+    def build_items(headers: dict, data) -> list[T]:
+        if isinstance(data, dict):
+            data = data[list_item]
+
+        return [
+            content_class(requester, headers, paginated._transformAttributes(element))
+            for element in data or []
+            if element is not None
+        ]
+
+    headers, data = requester.requestJsonAndCheck(
+        "GET", first_url, parameters=first_params, headers=request_headers
+    )
+    yield from build_items(headers, data)
+
+    last_page = last_page_number(headers)
+
+    if last_page is None:
+        # single page, or cursor pagination where pages can only be discovered one after another
+        next_url = parse_link_header(headers).get("next")
+
+        while next_url:
+            check_deadline()
+            headers, data = requester.requestJsonAndCheck(
+                "GET", next_url, headers=request_headers
+            )
+            yield from build_items(headers, data)
+            next_url = parse_link_header(headers).get("next")
+
+        return
+
+    log.debug("prefetching pages", url=first_url, pages=last_page, window=window)
+
+    # a requester holds a single connection, each thread needs its own copy
+    thread_state = threading.local()
+
+    def fetch_page(page: int) -> tuple[dict, t.Any]:
+        if not hasattr(thread_state, "requester"):
+            thread_state.requester = copy.copy(requester)
+
+        return thread_state.requester.requestJsonAndCheck(
+            "GET",
+            first_url,
+            parameters=first_params | {"page": page},
+            headers=request_headers,
+        )
+
+    with ThreadPoolExecutor(max_workers=window) as pool:
+
+        def submit(page: int) -> Future:
+            # request spans are children of whatever span is iterating the listing
+            return pool.submit(contextvars.copy_context().run, fetch_page, page)
+
+        pending_pages = iter(range(2, last_page + 1))
+        in_flight: deque[Future] = deque()
+
+        try:
+            for page in pending_pages:
+                in_flight.append(submit(page))
+
+                if len(in_flight) == window:
+                    break
+
+            while in_flight:
+                check_deadline()
+                page_headers, page_data = in_flight.popleft().result()
+
+                # keep the window full while the caller consumes this page
+                if (page := next(pending_pages, None)) is not None:
+                    in_flight.append(submit(page))
+
+                yield from build_items(page_headers, page_data)
+        finally:
+            # the caller stopped early, do not wait on pages nobody will read
+            for future in in_flight:
+                future.cancel()
@@ -0,0 +1,166 @@
+"""
+Worker processes which drain a `WorkQueue`, running each task through `repo_tasks.run_repo_task`
+"""
+
+import multiprocessing
+import os
+import socket
+import threading
+import time
+
+from github import Github
+
+from .accounts import Account
+from .repo_tasks import TaskOptions, run_repo_task
+from .tracing import configure_tracing, flush_spans, span
+from .utils import flush_logs, log
+from .work_queue import Task, WorkQueue, open_work_queue
+
+DEFAULT_LEASE_SECONDS = 15 * 60
+
+
+class LeaseHeartbeat:
+    """
+    Extend the lease of a running task in the background, so slow repos (LLM calls, huge PR lists) are not reclaimed
+    by another worker while they are still being processed.
+    """
+
+    def __init__(
+        self, queue_url: str, task: Task, worker_id: str, lease_seconds: float
+    ):
+        self.queue_url = queue_url
+        self.task = task
+        self.worker_id = worker_id
+        self.lease_seconds = lease_seconds
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+
+    def __enter__(self):
+        self._thread.start()
+        return self
+
+    def __exit__(self, *args):
+        self._stop.set()
+        self._thread.join()
+
+    def _run(self):
+        # sqlite connections cannot be shared across threads
+        queue = open_work_queue(self.queue_url)
+
+        while not self._stop.wait(self.lease_seconds / 3):
+            if not queue.extend_lease(self.task.id, self.worker_id, self.lease_seconds):
+                log.warning(
+                    "lost lease on task", task_id=self.task.id, repo=self.task.repo
+                )
+                return
+
+
+def process_task(
+    queue: WorkQueue,
+    queue_url: str,
+    task: Task,
+    worker_id: str,
+    github: Github,
+    login: str,
+    lease_seconds: float,
+) -> None:
+    with log.context(
+        task_id=task.id,
+        command=task.command,
+        account=task.account,
+        attempt=task.attempts,
+    ):
+        log.info("running task", repo=task.repo)
+
+        with (
+            LeaseHeartbeat(queue_url, task, worker_id, lease_seconds),
+            span("task", command=task.command, repo=task.repo, attempt=task.attempts),
+        ):
+            result = run_repo_task(
+                task.command, github, task.repo, TaskOptions(**task.options), login
+            )
+
+        if result["ok"]:
+            queue.complete(task.id, worker_id, result)
+        else:
+            log.warning("task failed", repo=task.repo, error=result["error"])
+            queue.fail(task.id, worker_id, result["error"])
+
+
+def run_worker(
+    queue_url: str,
+    accounts: list[Account],
+    until_empty: bool = False,
+    poll_interval: float = 10,
+    lease_seconds: float = DEFAULT_LEASE_SECONDS,
+) -> None:
+    """
+    Entrypoint of a worker process. Runs until the queue is empty (`until_empty`) or forever.
+    """
+
+    worker_id = f"{socket.gethostname()}:{os.getpid()}"
+    queue = open_work_queue(queue_url)
+    accounts_by_name = {account.name: account for account in accounts}
+
+    # one client per account, created on first use
+    clients: dict[str, tuple[Github, str]] = {}
+
+    configure_tracing()
+    log.info("worker started", worker_id=worker_id)
+
+    try:
+        while True:
+            task = queue.claim(worker_id, lease_seconds)
+
+            if task is None:
+                if until_empty:
+                    break
+
+                time.sleep(poll_interval)
+                continue
+
+            account = accounts_by_name.get(task.account)
+
+            if account is None:
+                queue.fail(
+                    task.id, worker_id, f"no credentials for account {task.account}"
+                )
+                continue
+
+            try:
+                if account.name not in clients:
+                    github = Github(account.token)
+                    clients[account.name] = (github, github.get_user().login)
+
+                github, login = clients[account.name]
+                process_task(
+                    queue, queue_url, task, worker_id, github, login, lease_seconds
+                )
+            except Exception as e:  # pylint: disable=broad-except
+                log.exception("task crashed", task_id=task.id, repo=task.repo)
+                queue.fail(task.id, worker_id, f"{type(e).__name__}: {e}")
+    finally:
+        log.info("worker stopped", worker_id=worker_id)
+        flush_spans()
+        flush_logs()
+
+
+def run_workers(
+    queue_url: str, accounts: list[Account], workers: int, until_empty: bool
+) -> None:
+    if workers == 1:
+        run_worker(queue_url, accounts, until_empty)
+        return
+
+    # spawn instead of fork: forked children would inherit the log writer without its background thread
+    context = multiprocessing.get_context("spawn")
+    processes = [
+        context.Process(target=run_worker, args=(queue_url, accounts, until_empty))
+        for _ in range(workers)
+    ]
+
+    for process in processes:
+        process.start()
+
+    for process in processes:
+        process.join()
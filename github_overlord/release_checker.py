@@ -1,5 +1,8 @@
-import os
+import typing as t
+from contextlib import contextmanager
+from dataclasses import dataclass
 from datetime import datetime, timezone
+from itertools import islice
 
 import funcy_pipe as fp
 from github import GithubException
@@ -7,7 +10,23 @@ from github.Repository import Repository
 from pydantic import BaseModel, Field
 from pydantic_ai import Agent
 
-from github_overlord.config import JINJA_ENV
+from github_overlord import checkpoint, release_rules
+from github_overlord.config import (
+    JINJA_ENV,
+    RELEASE_BATCH_TOKEN_BUDGET,
+    RELEASE_MAX_COMMITS,
+)
+from github_overlord.deadlines import (
+    REPO_DEADLINE_SECONDS,
+    DeadlineExceeded,
+    llm_timeout,
+)
+from github_overlord.release_prompt import (
+    CommitSummary,
+    build_commit_summary,
+    estimate_tokens,
+)
+from github_overlord.tracing import span
 from github_overlord.utils import log
 
 
@@ -21,6 +40,12 @@ class ReleaseAnalysis(BaseModel):
     release_notes: str = Field(description="Full markdown changelog for the release")
 
 
+class RepoReleaseAnalysis(ReleaseAnalysis):
+    """ReleaseAnalysis for one repository of a batched request."""
+
+    repo: str = Field(description="Repository name exactly as given in the prompt")
+
+
 class ReleaseDecision(BaseModel):
     """Decision about whether to create a release."""
 
@@ -29,6 +54,21 @@ class ReleaseDecision(BaseModel):
     release_notes: str
 
 
+NO_RELEASE = ReleaseDecision(should_create=False, suggested_version="", release_notes="")
+
+
+@dataclass
+class ReleaseCandidate:
+    """A repository with commits since its last release, ready for analysis."""
+
+    repo: Repository
+    baseline_tag: str | None
+    days_since_release: int
+    # None when the rules already decided, the commits are not packed for a prompt then
+    commit_summary: CommitSummary | None
+    rule_analysis: dict | None = None
+
+
 def should_create_release(repo: Repository) -> ReleaseDecision:
     """
     Analyze commits since last release and determine if a new release should be created.
@@ -37,6 +77,22 @@ def should_create_release(repo: Repository) -> ReleaseDecision:
         ReleaseDecision with should_create, suggested_version, and release_notes
     """
 
+    candidate = prepare_release_candidate(repo)
+
+    if candidate is None:
+        return NO_RELEASE
+
+    return decide_release(candidate, candidate.rule_analysis or analyze_candidate(candidate))
+
+
+def prepare_release_candidate(repo: Repository) -> ReleaseCandidate | None:
+    """
+    Collect and pack the commits since the last release.
+
+    Returns:
+        None if there is nothing to analyze
+    """
+
     # Get the last release
     releases = list(repo.get_releases())
 
@@ -51,40 +107,55 @@ def should_create_release(repo: Repository) -> ReleaseDecision:
         baseline_tag = None
         log.debug("no releases found, using repo creation date", date=baseline_date)
 
-    # Get commits since baseline (limit to 50)
+    # Get commits since baseline, bounded since every page is a request
     try:
-        all_commits = list(repo.get_commits(since=baseline_date, sha=repo.default_branch))
+        commits = list(
+            islice(
+                repo.get_commits(since=baseline_date, sha=repo.default_branch),
+                RELEASE_MAX_COMMITS,
+            )
+        )
     except GithubException as e:
         log.error("failed to get commits", error=str(e), code=e.status if hasattr(e, 'status') else None)
-        return ReleaseDecision(should_create=False, suggested_version="", release_notes="")
-
-    # Limit to last 50 commits
-    commits = all_commits[:50]
+        return None
 
     if not commits:
         log.info("no commits since last release", last_release=baseline_tag or "none")
-        return ReleaseDecision(should_create=False, suggested_version="", release_notes="")
+        return None
 
-    log.info("analyzing commits", count=len(commits), total_available=len(all_commits))
-
-    # Format commits for LLM
-    commit_summary = format_commits_for_llm(commits)
+    log.info("analyzing commits", count=len(commits))
 
     # Calculate days since last release
     days_since_release = (datetime.now(timezone.utc) - baseline_date).days
 
-    # Call LLM to analyze
-    analysis = analyze_commits_with_llm(
+    # Obvious ranges (only maintenance, only fixes) are decided without the LLM
+    if rule_analysis := release_rules.classify_release(repo, baseline_tag, commits):
+        return ReleaseCandidate(
+            repo=repo,
+            baseline_tag=baseline_tag,
+            days_since_release=days_since_release,
+            commit_summary=None,
+            rule_analysis=rule_analysis,
+        )
+
+    return ReleaseCandidate(
         repo=repo,
-        commit_summary=commit_summary,
-        commit_count=len(commits),
+        baseline_tag=baseline_tag,
         days_since_release=days_since_release,
-        last_tag=baseline_tag
+        # Pack commits into the prompt token budget, summarizing large ranges
+        commit_summary=build_commit_summary(repo.full_name, commits),
     )
 
+
+def decide_release(candidate: ReleaseCandidate, analysis: dict) -> ReleaseDecision:
+    """Turn the rule or LLM analysis of a candidate into a release decision."""
+
+    repo = candidate.repo
+    baseline_tag = candidate.baseline_tag
+
     if not analysis:
         log.error("LLM analysis failed")
-        return ReleaseDecision(should_create=False, suggested_version="", release_notes="")
+        return NO_RELEASE
 
     should_release = analysis.get("should_release", "no") in ["yes", "maybe"]
 
@@ -93,7 +164,9 @@ def should_create_release(repo: Repository) -> ReleaseDecision:
         release_notes = generate_release_notes(repo, baseline_tag, suggested_version, analysis)
 
         log.info(
-            "LLM recommends release",
+            "release recommended",
+            decided_by=analysis.get("decided_by", "llm"),
+            rule=analysis.get("rule"),
             decision=analysis.get("should_release"),
             confidence=analysis.get("confidence", 0),
             version=suggested_version,
@@ -108,64 +181,148 @@ def should_create_release(repo: Repository) -> ReleaseDecision:
         )
 
     log.info(
-        "LLM does not recommend release",
+        "release not recommended",
+        decided_by=analysis.get("decided_by", "llm"),
+        rule=analysis.get("rule"),
         decision=analysis.get("should_release", "no"),
         confidence=analysis.get("confidence", 0),
         reasoning=analysis.get("reasoning", "")
     )
-    return ReleaseDecision(should_create=False, suggested_version="", release_notes="")
+    return NO_RELEASE
 
 
-def format_commits_for_llm(commits) -> str:
-    """Format commits into a readable summary for LLM analysis."""
+def release_prompt_fields(repo_name: str, commit_summary: CommitSummary, days_since_release: int, last_tag: str | None) -> dict:
+    """Variables for the per-repository section of the release analysis prompts."""
 
-    commit_lines = []
-
-    for commit in commits[:50]:  # Limit to avoid token limits
-        # Get first line of commit message
-        message_lines = commit.commit.message.strip().split("\n")
-        first_line = message_lines[0][:100]  # Limit length
-
-        author = commit.commit.author.name
-        date = commit.commit.author.date.strftime("%Y-%m-%d")
-
-        commit_lines.append(f"- [{date}] {first_line} (@{author})")
+    last_release_info = f"Last release: {last_tag} ({days_since_release} days ago)" if last_tag else f"No previous releases (repo is {days_since_release} days old)"
 
-    return "\n".join(commit_lines)
+    return {
+        "repo_name": repo_name,
+        "last_release_info": last_release_info,
+        "commit_count": commit_summary.included_count,
+        "noise_commit_count": commit_summary.noise_count,
+        "omitted_commit_count": commit_summary.omitted_count,
+        "summarized": commit_summary.summarized,
+        "commit_summary": commit_summary.text,
+    }
 
 
-def analyze_commits_with_llm(repo: Repository, commit_summary: str, commit_count: int, days_since_release: int, last_tag: str | None) -> dict:
+def analyze_commits_with_llm(repo: Repository, commit_summary: CommitSummary, days_since_release: int, last_tag: str | None) -> dict:
     """Use Gemini via Pydantic AI to analyze commits and determine if a release should be created."""
 
     template = JINJA_ENV.get_template("release_analysis_prompt.j2")
 
-    last_release_info = f"Last release: {last_tag} ({days_since_release} days ago)" if last_tag else f"No previous releases (repo is {days_since_release} days old)"
-
     prompt = template.render(
-        repo_name=repo.full_name,
-        last_release_info=last_release_info,
-        commit_count=commit_count,
-        commit_summary=commit_summary
+        repo=release_prompt_fields(repo.full_name, commit_summary, days_since_release, last_tag)
     )
 
+    # raises if a deadline expired, which must not be mistaken for a failed LLM call
+    timeout = llm_timeout()
+
     try:
         # Create agent with structured output
         # Using gemini-flash which points to latest flash model
         agent = Agent(
             'google-gla:gemini-flash',
-            result_type=ReleaseAnalysis,
+            output_type=ReleaseAnalysis,
         )
 
-        result = agent.run_sync(prompt)
+        with span("llm", model="gemini-flash", purpose="release_analysis"):
+            result = agent.run_sync(prompt, model_settings={"timeout": timeout})
 
         # Convert Pydantic model to dict for compatibility
-        return result.data.model_dump()
+        return result.output.model_dump()
 
     except Exception as e:
         log.error("LLM API call failed", error=str(e))
         return {}
 
 
+def analyze_candidate(candidate: ReleaseCandidate) -> dict:
+    return analyze_commits_with_llm(
+        repo=candidate.repo,
+        commit_summary=candidate.commit_summary,
+        days_since_release=candidate.days_since_release,
+        last_tag=candidate.baseline_tag
+    )
+
+
+def analyze_candidates(candidates: list[ReleaseCandidate]) -> dict[str, dict]:
+    """
+    Analyze several repositories in a single LLM request.
+
+    Repositories missing from the response, or all of them if the response fails validation, are analyzed with one
+    request each instead.
+
+    Returns:
+        analysis dict (empty if the analysis failed) keyed by repository full name
+    """
+
+    if len(candidates) == 1:
+        return {candidates[0].repo.full_name: analyze_candidate(candidates[0])}
+
+    expected = {candidate.repo.full_name for candidate in candidates}
+    analyses = {}
+
+    template = JINJA_ENV.get_template("release_batch_analysis_prompt.j2")
+
+    prompt = template.render(
+        repos=[
+            release_prompt_fields(candidate.repo.full_name, candidate.commit_summary, candidate.days_since_release, candidate.baseline_tag)
+            for candidate in candidates
+        ]
+    )
+
+    timeout = llm_timeout()
+
+    try:
+        agent = Agent(
+            'google-gla:gemini-flash',
+            output_type=list[RepoReleaseAnalysis],
+        )
+
+        with span("llm", model="gemini-flash", purpose="release_batch_analysis", repos=len(candidates)):
+            result = agent.run_sync(prompt, model_settings={"timeout": timeout})
+
+        analyses = {
+            analysis.repo: analysis.model_dump(exclude={"repo"})
+            for analysis in result.output
+            if analysis.repo in expected
+        }
+    except Exception as e:
+        log.error("batched LLM API call failed", error=str(e), repos=len(candidates))
+
+    missing = [candidate for candidate in candidates if candidate.repo.full_name not in analyses]
+
+    log.info("batched release analysis", repos=len(candidates), missing=len(missing))
+
+    # fall back to one request per repository for whatever the batch did not cover
+    for candidate in missing:
+        with log.context(repo=candidate.repo.full_name):
+            analyses[candidate.repo.full_name] = analyze_candidate(candidate)
+
+    return analyses
+
+
+def pack_candidates(candidates: list[ReleaseCandidate], token_budget: int = RELEASE_BATCH_TOKEN_BUDGET) -> list[list[ReleaseCandidate]]:
+    """Group candidates so the commit summaries of each group fit in one batched prompt."""
+
+    batches: list[list[ReleaseCandidate]] = []
+    batch_tokens = 0
+
+    for candidate in candidates:
+        tokens = estimate_tokens(candidate.commit_summary.text)
+
+        if not batches or batch_tokens + tokens > token_budget:
+            batches.append([])
+            batch_tokens = 0
+
+        batches[-1].append(candidate)
+        batch_tokens += tokens
+
+    return batches
+
+
 def calculate_next_version(current_tag: str | None, bump_type: str) -> str:
     """Calculate the next semantic version based on the current tag and bump type."""
 
@@ -251,6 +408,7 @@ def create_release(repo: Repository, tag: str, notes: str, dry_run: bool) -> boo
         )
 
         log.info("created release", repo=repo.full_name, tag=tag)
+        checkpoint.record("release_created", repo=repo.full_name, tag=tag)
         return True
 
     except GithubException as e:
@@ -266,49 +424,107 @@ def check_repo_for_release(repo: Repository, dry_run: bool) -> dict:
         dict with keys: checked, skipped, created, failed
     """
 
-    result = {
-        "checked": False,
-        "skipped": False,
-        "created": False,
-        "failed": False
-    }
+    [(_repo, result)] = check_repos_for_release([repo], dry_run)
+    return result
+
 
-    with log.context(repo=repo.full_name):
-        log.debug("checking repository for release")
+def check_repos_for_release(repos: t.Iterable[Repository], dry_run: bool, batch_size: int = 1) -> t.Iterator[tuple[Repository, dict]]:
+    """
+    Check repositories and create releases where recommended. With a `batch_size` above 1, the commits of up to
+    `batch_size` repositories are analyzed in a single LLM request.
+
+    Yields:
+        (repo, dict with keys: checked, skipped, created, failed, deferred), once the repository is done
+    """
 
-        # Skip archived repos
-        if repo.archived:
-            log.debug("skipping archived repo")
+    for batch in repos | fp.chunks(batch_size):
+        results = {}
+        candidates = []
+
+        for repo in batch:
+            results[repo.full_name] = result = {
+                "checked": False,
+                "skipped": False,
+                "created": False,
+                "failed": False,
+                # abandoned because of the repo deadline, checked again by the next run
+                "deferred": False
+            }
+
+            with log.context(repo=repo.full_name), span("repo", command="check-releases", repo=repo.full_name):
+                with checkpoint.deferrable("repo", REPO_DEADLINE_SECONDS, repo=repo.full_name) as deferral, record_failures(result):
+                    if candidate := prepare_repo(repo, result):
+                        candidates.append(candidate)
+
+                result["deferred"] = deferral.deferred
+
+        analyses = {
+            candidate.repo.full_name: candidate.rule_analysis
+            for candidate in candidates
+            if candidate.rule_analysis
+        }
+
+        for candidates_batch in pack_candidates([candidate for candidate in candidates if not candidate.rule_analysis]):
+            analyses |= analyze_candidates(candidates_batch)
+
+        candidates_by_repo = {candidate.repo.full_name: candidate for candidate in candidates}
+
+        for repo in batch:
+            result = results[repo.full_name]
+
+            if candidate := candidates_by_repo.get(repo.full_name):
+                with log.context(repo=repo.full_name), checkpoint.deferrable("repo", REPO_DEADLINE_SECONDS, repo=repo.full_name) as deferral, record_failures(result):
+                    decision = decide_release(candidate, analyses.get(repo.full_name, {}))
+
+                    if decision.should_create:
+                        success = create_release(repo, decision.suggested_version, decision.release_notes, dry_run)
+                        if success:
+                            result["created"] = True
+                        else:
+                            result["failed"] = True
+                    else:
+                        log.debug("no release needed")
+
+                result["deferred"] = deferral.deferred
+
+            yield repo, result
+
+
+def prepare_repo(repo: Repository, result: dict) -> ReleaseCandidate | None:
+    log.debug("checking repository for release")
+
+    # Skip archived repos
+    if repo.archived:
+        log.debug("skipping archived repo")
+        result["skipped"] = True
+        return None
+
+    # Skip empty repos
+    try:
+        if repo.size == 0:
+            log.debug("skipping empty repo")
             result["skipped"] = True
-            return result
-
-        # Skip empty repos
-        try:
-            if repo.size == 0:
-                log.debug("skipping empty repo")
-                result["skipped"] = True
-                return result
-        except Exception:
-            pass  # If we can't determine size, continue anyway
-
-        result["checked"] = True
-
-        try:
-            decision = should_create_release(repo)
-
-            if decision.should_create:
-                success = create_release(repo, decision.suggested_version, decision.release_notes, dry_run)
-                if success:
-                    result["created"] = True
-                else:
-                    result["failed"] = True
-            else:
-                log.debug("no release needed")
-        except GithubException as e:
-            log.error("GitHub API error", error=str(e), status=e.status if hasattr(e, 'status') else None)
-            result["failed"] = True
-        except Exception as e:
-            log.error("unexpected error checking repository", error=str(e), error_type=type(e).__name__)
-            result["failed"] = True
+            return None
+    except Exception:
+        pass  # If we can't determine size, continue anyway
 
-    return result
+    result["checked"] = True
+
+    return prepare_release_candidate(repo)
+
+
+@contextmanager
+def record_failures(result: dict):
+    """Log errors while checking a repository and mark its result as failed, so other repositories are still checked."""
+
+    try:
+        yield
+    except DeadlineExceeded:
+        # not a failure of this repository, handled by whoever set the deadline
+        raise
+    except GithubException as e:
+        log.error("GitHub API error", error=str(e), status=e.status if hasattr(e, 'status') else None)
+        result["failed"] = True
+    except Exception as e:
+        log.error("unexpected error checking repository", error=str(e), error_type=type(e).__name__)
+        result["failed"] = True
@@ -0,0 +1,198 @@
+"""
+Build the commit summary for `release_analysis_prompt.j2` within a token budget.
+
+Small ranges are sent as-is, large ranges are split into budget-sized chunks which are summarized in parallel (map)
+and the summaries become the commit summary of the final analysis prompt (reduce).
+"""
+
+import asyncio
+from dataclasses import dataclass
+
+from github.Commit import Commit
+from pydantic_ai import Agent
+
+from github_overlord.config import (
+    RELEASE_PROMPT_MAX_CHUNKS,
+    RELEASE_PROMPT_TOKEN_BUDGET,
+)
+from github_overlord.deadlines import llm_timeout
+from github_overlord.tracing import span
+from github_overlord.utils import log
+
+# rough, but good enough for budgeting: ~4 characters per token for English + code
+CHARS_PER_TOKEN = 4
+
+MAX_SUBJECT_LENGTH = 200
+
+BOT_AUTHORS = {"dependabot[bot]", "renovate[bot]", "github-actions[bot]"}
+
+MERGE_COMMIT_PREFIXES = (
+    "Merge pull request",
+    "Merge branch",
+    "Merge remote-tracking branch",
+)
+
+CHUNK_SUMMARY_PROMPT = """
+Summarize the following commits from {repo_name} for someone deciding whether to cut a new release.
+Group related commits, keep every user-facing change, feature, fix and breaking change, and drop trivia.
+Respond with a concise markdown bullet list, at most {max_tokens} tokens.
+
+Commits:
+{commit_lines}
+"""
+
+
+@dataclass
+class CommitSummary:
+    text: str
+    # commits represented in `text`, either directly or through a chunk summary
+    included_count: int
+    # merge commits and bot commits collapsed into a single line
+    noise_count: int
+    # commits which did not fit even after summarization
+    omitted_count: int = 0
+    summarized: bool = False
+
+
+def estimate_tokens(text: str) -> int:
+    return len(text) // CHARS_PER_TOKEN + 1
+
+
+def commit_author(commit: Commit) -> str:
+    # `commit.author` is the GitHub user and may be None, the git author name is always present
+    if commit.author is not None:
+        return commit.author.login
+
+    return commit.commit.author.name
+
+
+def is_merge_commit(commit: Commit) -> bool:
+    return len(commit.parents) > 1 or commit.commit.message.startswith(
+        MERGE_COMMIT_PREFIXES
+    )
+
+
+def is_bot_commit(commit: Commit) -> bool:
+    return commit_author(commit) in BOT_AUTHORS
+
+
+def format_commit(commit: Commit) -> str:
+    first_line = commit.commit.message.strip().split("\n")[0][:MAX_SUBJECT_LENGTH]
+    date = commit.commit.author.date.strftime("%Y-%m-%d")
+
+    return f"- [{date}] {first_line} (@{commit_author(commit)})"
+
+
+def chunk_lines(lines: list[str], token_budget: int) -> list[list[str]]:
+    chunks: list[list[str]] = [[]]
+    chunk_tokens = 0
+
+    for line in lines:
+        line_tokens = estimate_tokens(line)
+
+        if chunks[-1] and chunk_tokens + line_tokens > token_budget:
+            chunks.append([])
+            chunk_tokens = 0
+
+        chunks[-1].append(line)
+        chunk_tokens += line_tokens
+
+    return chunks
+
+
+async def summarize_chunks(
+    repo_name: str, chunks: list[list[str]], max_tokens: int
+) -> list[str]:
+    agent = Agent("google-gla:gemini-flash")
+
+    async def summarize(chunk: list[str]) -> str:
+        with span("llm", model="gemini-flash", purpose="commit_chunk_summary"):
+            result = await agent.run(
+                CHUNK_SUMMARY_PROMPT.format(
+                    repo_name=repo_name,
+                    max_tokens=max_tokens,
+                    commit_lines="\n".join(chunk),
+                ),
+                model_settings={"timeout": llm_timeout()},
+            )
+
+        return result.output
+
+    return await asyncio.gather(*[summarize(chunk) for chunk in chunks])
+
+
+def build_commit_summary(
+    repo_name: str,
+    commits: list[Commit],
+    token_budget: int = RELEASE_PROMPT_TOKEN_BUDGET,
+    max_chunks: int = RELEASE_PROMPT_MAX_CHUNKS,
+) -> CommitSummary:
+    """
+    Pack `commits` (newest first, as returned by the API) into at most `token_budget` tokens
+    """
+
+    merge_commits = [commit for commit in commits if is_merge_commit(commit)]
+    bot_commits = [
+        commit
+        for commit in commits
+        if not is_merge_commit(commit) and is_bot_commit(commit)
+    ]
+    meaningful_commits = [
+        commit
+        for commit in commits
+        if not is_merge_commit(commit) and not is_bot_commit(commit)
+    ]
+
+    lines = []
+
+    # dependency bumps still matter for the decision (patch release), but one line is enough to convey that.
+    # It goes first so it is never dropped along with the oldest commits.
+    if bot_commits:
+        lines.append(f"- {len(bot_commits)} automated dependency/bot commits")
+
+    lines += [format_commit(commit) for commit in meaningful_commits]
+
+    noise_count = len(merge_commits) + len(bot_commits)
+    total_tokens = sum(estimate_tokens(line) for line in lines)
+
+    log.debug(
+        "packing commits for release analysis",
+        commits=len(commits),
+        noise=noise_count,
+        estimated_tokens=total_tokens,
+        token_budget=token_budget,
+    )
+
+    if total_tokens <= token_budget:
+        return CommitSummary(
+            text="\n".join(lines),
+            included_count=len(meaningful_commits) + len(bot_commits),
+            noise_count=noise_count,
+        )
+
+    chunks = chunk_lines(lines, token_budget)
+    omitted_count = 0
+
+    if len(chunks) > max_chunks:
+        # newest commits come first, drop the oldest chunks
+        omitted_count = sum(len(chunk) for chunk in chunks[max_chunks:])
+        chunks = chunks[:max_chunks]
+
+    log.info(
+        "commit range exceeds token budget, summarizing in chunks",
+        chunks=len(chunks),
+        omitted=omitted_count,
+    )
+
+    # each summary gets an equal share of the final prompt budget
+    chunk_summaries = asyncio.run(
+        summarize_chunks(repo_name, chunks, token_budget // len(chunks))
+    )
+
+    return CommitSummary(
+        text="\n\n".join(chunk_summaries),
+        included_count=len(meaningful_commits) + len(bot_commits) - omitted_count,
+        noise_count=noise_count,
+        omitted_count=omitted_count,
+        summarized=True,
+    )
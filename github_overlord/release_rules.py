@@ -0,0 +1,195 @@
+"""
+Decide obvious release cases from the commits alone, before asking the LLM.
+
+Commits are classified by conventional-commit type (`fix:`, `chore(deps):`, `feat!:`), author (Dependabot, Renovate
+and other bots) and, for commits without a recognizable type, the paths the range touched. Ranges of only maintenance
+commits are "no release", ranges of only fixes (plus maintenance) are a patch release. Anything with a feature, a
+breaking change or an unclassifiable commit is left to the LLM.
+
+The result has the same shape as the LLM analysis, with `decided_by` and `rule` added, so both are logged the same way.
+"""
+
+import re
+import typing as t
+from collections import Counter
+
+from github import GithubException
+from github.Commit import Commit
+from github.Repository import Repository
+
+from github_overlord.release_prompt import (
+    MAX_SUBJECT_LENGTH,
+    commit_author,
+    is_bot_commit,
+    is_merge_commit,
+)
+from github_overlord.utils import log
+
+CONVENTIONAL_COMMIT_RE = re.compile(
+    r"^(?P<type>[a-zA-Z]+)(?:\((?P<scope>[^)]*)\))?(?P<breaking>!)?:\s"
+)
+BREAKING_CHANGE_RE = re.compile(r"^BREAKING[ -]CHANGE:", re.MULTILINE)
+
+DEPENDENCY_BOTS = {"dependabot[bot]", "renovate[bot]"}
+
+# types which never warrant a release on their own
+MAINTENANCE_TYPES = {
+    "chore",
+    "ci",
+    "build",
+    "docs",
+    "doc",
+    "test",
+    "tests",
+    "style",
+    "refactor",
+}
+PATCH_TYPES = {"fix", "perf"}
+
+# paths which do not change what users of the project get
+MAINTENANCE_PATH_RE = re.compile(
+    r"^(?:\.github/|\.vscode/|\.devcontainer/|docs?/|tests?/)"
+    r"|(?:^|/)(?:README|CHANGELOG|CONTRIBUTING|CODE_OF_CONDUCT|LICENSE)[^/]*$"
+    r"|\.md$"
+    r"|^\.(?:gitignore|gitattributes|editorconfig|pre-commit-config\.yaml)$"
+)
+
+# the compare API lists at most 300 files, a truncated list cannot prove a range is maintenance only
+COMPARE_MAX_FILES = 300
+
+CommitKind = t.Literal[
+    "merge", "dependency", "maintenance", "patch", "significant", "unknown"
+]
+
+
+def classify_commit(commit: Commit) -> CommitKind:
+    if is_merge_commit(commit):
+        return "merge"
+
+    author = commit_author(commit)
+
+    if author in DEPENDENCY_BOTS:
+        return "dependency"
+
+    if is_bot_commit(commit):
+        return "maintenance"
+
+    message = commit.commit.message.strip()
+    match = CONVENTIONAL_COMMIT_RE.match(message)
+
+    if BREAKING_CHANGE_RE.search(message) or (match and match.group("breaking")):
+        return "significant"
+
+    if match is None:
+        return "unknown"
+
+    commit_type = match.group("type").lower()
+    scope = (match.group("scope") or "").lower()
+
+    if scope == "deps" and commit_type in MAINTENANCE_TYPES:
+        return "dependency"
+
+    if commit_type in MAINTENANCE_TYPES:
+        return "maintenance"
+
+    if commit_type in PATCH_TYPES or scope == "deps":
+        return "patch"
+
+    # feat, revert and custom types
+    return "significant"
+
+
+def touches_only_maintenance_paths(repo: Repository, baseline_tag: str | None) -> bool:
+    """
+    One compare request for the whole range, instead of fetching every commit for its files
+    """
+
+    if not baseline_tag:
+        return False
+
+    try:
+        files = [
+            file.filename
+            for file in repo.compare(baseline_tag, repo.default_branch).files
+        ]
+    except GithubException as e:
+        log.warning("failed to compare release range", base=baseline_tag, error=str(e))
+        return False
+
+    if not files or len(files) >= COMPARE_MAX_FILES:
+        return False
+
+    return all(MAINTENANCE_PATH_RE.search(filename) for filename in files)
+
+
+def patch_release_notes(commits: list[Commit], kinds: list[CommitKind]) -> str:
+    fixes = [
+        commit.commit.message.strip().split("\n")[0][:MAX_SUBJECT_LENGTH]
+        for commit, kind in zip(commits, kinds)
+        if kind == "patch"
+    ]
+    dependency_count = kinds.count("dependency")
+
+    lines = ["## What's Changed", "", "### Bug Fixes"]
+    lines += [f"- {subject}" for subject in fixes]
+
+    if dependency_count:
+        lines += ["", "### Dependencies", f"- {dependency_count} dependency updates"]
+
+    return "\n".join(lines)
+
+
+def rule_analysis(
+    should_release: str, rule: str, reasoning: str, release_notes: str = ""
+) -> dict:
+    return {
+        "should_release": should_release,
+        "confidence": 100,
+        "reasoning": reasoning,
+        "suggested_version_bump": "patch",
+        "release_notes": release_notes,
+        "decided_by": "rules",
+        "rule": rule,
+    }
+
+
+def classify_release(
+    repo: Repository, baseline_tag: str | None, commits: list[Commit]
+) -> dict | None:
+    """
+    Analysis dict for an obvious range, None if the LLM needs to decide
+    """
+
+    kinds = [classify_commit(commit) for commit in commits]
+    counts = Counter(kinds)
+
+    log.debug("classified commits", **counts)
+
+    if counts["significant"]:
+        return None
+
+    if counts["unknown"]:
+        # commits without a conventional type could be anything, unless the range only touched docs, CI and tests
+        if counts["patch"] or not touches_only_maintenance_paths(repo, baseline_tag):
+            return None
+
+        return rule_analysis(
+            "no",
+            "maintenance_paths",
+            "Only documentation, CI and test files changed since the last release.",
+        )
+
+    if counts["patch"]:
+        return rule_analysis(
+            "yes",
+            "fixes_only",
+            f"{counts['patch']} fixes and no new features since the last release.",
+            patch_release_notes(commits, kinds),
+        )
+
+    return rule_analysis(
+        "no",
+        "maintenance_only",
+        f"Only dependency updates ({counts['dependency']}) and maintenance commits "
+        f"({counts['maintenance'] + counts['merge']}) since the last release.",
+    )
@@ -0,0 +1,89 @@
+"""
+Prefilter for repo listings: decide which repos need any per-repo requests at all.
+
+Only fields which are part of the `get_repos` listing payload (`archived`, `fork`, `size`, `open_issues_count`,
+`pushed_at`) are used, so filtering is free. Accessing anything else on a listed repo triggers a full fetch.
+"""
+
+import typing as t
+from collections import Counter
+from datetime import datetime, timedelta, timezone
+
+from github.Repository import Repository
+
+from .utils import log
+
+# repos without a push in this long are probably not worth it
+DEFAULT_MAX_INACTIVE_DAYS = 5 * 365
+
+# commands which only act on open PRs. `open_issues_count` includes PRs, so 0 means there is nothing to do.
+OPEN_PR_COMMANDS = {"dependabot", "keep-alive-prs"}
+
+# commands which operate on the user's own repos. keep-alive-prs maps forks to their parent instead.
+SKIP_FORK_COMMANDS = {"dependabot", "check-releases"}
+
+
+def skip_reason(
+    command: str,
+    repo: Repository,
+    max_inactive_days: int | None,
+    now: datetime,
+) -> str | None:
+    """
+    Returns why `repo` can be skipped by `command`, or None if it needs to be processed
+    """
+
+    if repo.archived:
+        return "archived"
+
+    if command in SKIP_FORK_COMMANDS and repo.fork:
+        return "fork"
+
+    # only an explicit 0 is empty, repos built from GraphQL may not know their size (None)
+    if repo.size == 0:
+        return "empty"
+
+    if command in OPEN_PR_COMMANDS and repo.open_issues_count == 0:
+        return "no_open_prs"
+
+    # dependabot pushes its branches to the repo itself, so an open dependabot PR always bumps `pushed_at`
+    if (
+        max_inactive_days
+        and repo.pushed_at
+        and now - repo.pushed_at > timedelta(days=max_inactive_days)
+    ):
+        return "inactive"
+
+    return None
+
+
+def prefilter(
+    command: str,
+    repos: t.Iterable[Repository],
+    max_inactive_days: int | None = DEFAULT_MAX_INACTIVE_DAYS,
+) -> t.Iterator[Repository]:
+    """
+    Lazily drop repos `command` has nothing to do for, the skip counts are logged once the listing is exhausted
+    """
+
+    now = datetime.now(timezone.utc)
+    skipped: Counter[str] = Counter()
+
+    try:
+        for repo in repos:
+            reason = skip_reason(command, repo, max_inactive_days, now)
+
+            if reason is None:
+                yield repo
+                continue
+
+            skipped[reason] += 1
+            log.debug("prefilter skipped repo", repo=repo.full_name, reason=reason)
+    finally:
+        if skipped:
+            log.info(
+                "prefilter skipped repos",
+                command=command,
+                total=sum(skipped.values()),
+                **skipped,
+            )
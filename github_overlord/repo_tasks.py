@@ -0,0 +1,227 @@
+"""
+Per-repository units of work for the commands which operate on repos. Used by the commands themselves and by the
+execution backends which spread repos across processes.
+
+Command modules are imported inside the functions: importing this module must not pull in the LLM SDKs.
+"""
+
+import typing as t
+from dataclasses import dataclass
+
+import funcy_pipe as fp
+from github import Github
+from github.Repository import Repository
+
+from .change_feed import mark_processed, only_changed
+from .deadlines import REPO_DEADLINE_SECONDS, deadline
+from .dependabot_search import search_dependabot_repos
+from .fork_parents import upstream_repos
+from .pagination import prefetch_pages
+from .repo_filter import DEFAULT_MAX_INACTIVE_DAYS, prefilter
+from .utils import log
+
+REPO_COMMANDS = ("dependabot", "keep-alive-prs", "check-releases")
+
+
+@dataclass(frozen=True)
+class TaskOptions:
+    """
+    Command options which apply to every repo. Must stay picklable, it is sent to worker processes.
+    """
+
+    dry_run: bool = False
+    # required for check-releases
+    topic: str | None = None
+    merge_policy: str = "all"
+    skip_maintainer_changes: bool = False
+    auto_merge: bool = False
+    # dependabot only: find repos with open Dependabot PRs with a search instead of listing every repo
+    search: bool = False
+    # skip repos without a push in this many days, 0 or None disables the cutoff
+    max_inactive_days: int | None = DEFAULT_MAX_INACTIVE_DAYS
+    # only repos with activity in the events feeds since the command last listed repos
+    changed_only: bool = False
+
+
+def list_repos(
+    command: str,
+    github: Github,
+    options: TaskOptions,
+    orgs: t.Sequence[str] = (),
+    pr_numbers: dict[str, list[int]] | None = None,
+) -> t.Iterable[Repository]:
+    """
+    The repos a command operates on for the authenticated user, without the repos `prefilter` rules out.
+
+    dependabot and check-releases also operate on the repos of `orgs`, keep-alive-prs only on the user's forks. With
+    `options.search`, the numbers of the Dependabot PRs found are added to `pr_numbers`.
+    """
+
+    repos = _list_repos(command, github, options, orgs, pr_numbers)
+
+    if options.changed_only:
+        return only_changed(command, github, repos)
+
+    return repos
+
+
+def _owned_repos(github: Github, orgs: t.Sequence[str]) -> t.Iterator[Repository]:
+    user = github.get_user()
+    login = user.login
+
+    yield from prefetch_pages(user.get_repos(type="public")) | fp.filter(
+        lambda repo: repo.owner.login == login
+    )
+
+    for org in orgs:
+        yield from prefetch_pages(
+            github.get_organization(org).get_repos(type="public")
+        ) | fp.filter(lambda repo, org=org: repo.owner.login.lower() == org.lower())
+
+
+def _list_repos(
+    command: str,
+    github: Github,
+    options: TaskOptions,
+    orgs: t.Sequence[str],
+    pr_numbers: dict[str, list[int]] | None,
+) -> t.Iterable[Repository]:
+    user = github.get_user()
+    login = user.login
+
+    if command == "dependabot" and options.search:
+        return prefilter(
+            command,
+            search_dependabot_repos(github, [login, *orgs], pr_numbers),
+            options.max_inactive_days,
+        )
+
+    if command == "dependabot":
+        return prefilter(command, _owned_repos(github, orgs), options.max_inactive_days)
+
+    if command == "keep-alive-prs":
+        # TODO this isn't perfect because you may be a contributor :/
+        # filtered after resolving forks, the activity of the upstream repo is what matters
+        return prefilter(
+            command,
+            upstream_repos(
+                github, prefetch_pages(user.get_repos(type="public")), login
+            ),
+            options.max_inactive_days,
+        )
+
+    if command == "check-releases":
+        assert options.topic, "topic is required for check-releases"
+
+        # `topics` is part of the listing payload, `get_topics()` would cost a request per repo
+        return prefilter(
+            command, _owned_repos(github, orgs), options.max_inactive_days
+        ) | fp.filter(lambda r: options.topic in r.topics)
+
+    raise ValueError(f"unknown repo command: {command}")
+
+
+def run_repo_task(
+    command: str,
+    github: Github,
+    repo: Repository | str,
+    options: TaskOptions,
+    login: str | None = None,
+) -> dict:
+    """
+    Run `command` against a single repo. Exceptions are captured in the result so one broken repo does not stop a run,
+    including the repo deadline being exceeded.
+
+    Pass `login` when running many tasks, otherwise it is fetched for every keep-alive-prs (and `changed_only`) task.
+
+    Returns a dict with `command`, `repo`, `ok`, `error` and command specific counts.
+    """
+
+    if isinstance(repo, str):
+        repo = github.get_repo(repo)
+
+    result: dict[str, t.Any] = {
+        "command": command,
+        "repo": repo.full_name,
+        "ok": True,
+        "error": None,
+    }
+
+    try:
+        with deadline("repo", REPO_DEADLINE_SECONDS):
+            result |= _run(command, github, repo, options, login)
+    except Exception as e:  # pylint: disable=broad-except
+        log.exception("repo task failed", command=command, repo=repo.full_name)
+        result |= {"ok": False, "error": f"{type(e).__name__}: {e}"}
+
+    # with --changed-only, failed and deferred repos stay pending and are listed again
+    if options.changed_only and result["ok"] and not result.get("deferred"):
+        mark_processed(command, login or github.get_user().login, repo.full_name)
+
+    return result
+
+
+def _run(
+    command: str,
+    github: Github,
+    repo: Repository,
+    options: TaskOptions,
+    login: str | None,
+) -> dict:
+    if command == "dependabot":
+        from .dependabot_merger import MergePolicy, process_repo
+        from .merge_failure_cache import MergeFailureCache
+
+        policy = MergePolicy.from_options(
+            options.merge_policy, options.skip_maintainer_changes, options.auto_merge
+        )
+        failure_cache = MergeFailureCache(github.oauth_scopes)
+
+        try:
+            merged = process_repo(repo, options.dry_run, policy, failure_cache)
+        finally:
+            failure_cache.save()
+            failure_cache.log_summary()
+
+        return {"merged": merged, "skipped_unmergeable": len(failure_cache.skipped)}
+
+    if command == "keep-alive-prs":
+        from .stale_commenter import inspect_repo_for_stale_prs
+
+        login = login or github.get_user().login
+        return {
+            "commented": sum(inspect_repo_for_stale_prs(options.dry_run, login, repo))
+        }
+
+    if command == "check-releases":
+        from .release_checker import check_repo_for_release
+
+        result = check_repo_for_release(repo, options.dry_run)
+
+        # errors are logged and flagged instead of raised, the task still has to fail so it is retried
+        if result["failed"]:
+            result |= {"ok": False, "error": "release check failed, see the log"}
+
+        return result
+
+    raise ValueError(f"unknown repo command: {command}")
+
+
+def summarize_results(results: list[dict]) -> dict:
+    """
+    Merge per-repo results into totals: every numeric/boolean field is summed
+    """
+
+    summary: dict[str, t.Any] = {"repos": len(results), "errors": 0}
+
+    for result in results:
+        if not result["ok"]:
+            summary["errors"] += 1
+
+        for key, value in result.items():
+            if key == "ok" or not isinstance(value, (int, bool)):
+                continue
+
+            summary[key] = summary.get(key, 0) + int(value)
+
+    return summary
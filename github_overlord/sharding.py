@@ -0,0 +1,197 @@
+"""
+Run a repo command across several accounts, sharding each account's repos over worker processes.
+
+Every shard only ever uses its own account's token, so one account exhausting its rate limit only pauses that
+account's shards. Results from all shards are merged into a single report.
+"""
+
+import multiprocessing
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+from github import Github
+
+from .accounts import Account
+from .deadlines import deadline, expired_scope, expires_at
+from .repo_tasks import TaskOptions, list_repos, run_repo_task, summarize_results
+from .tracing import configure_tracing, flush_spans, span
+from .utils import flush_logs, log
+
+# stop using a token once it is this close to its limit, leaves room for the interactive use of the same token
+RATE_LIMIT_RESERVE = 50
+
+
+def wait_for_rate_limit(github: Github) -> None:
+    # populated from the headers of the last response, only the very first call costs a (free) request
+    remaining, _limit = github.rate_limiting
+
+    if remaining > RATE_LIMIT_RESERVE:
+        return
+
+    sleep_seconds = max(github.rate_limiting_resettime - time.time(), 0) + 1
+
+    # wake up in time to defer the rest of the shard instead of sleeping past the deadline
+    if (closest := expires_at()) is not None:
+        sleep_seconds = min(sleep_seconds, max(closest - time.time(), 0))
+
+    log.warning(
+        "rate limit almost exhausted, pausing shard",
+        remaining=remaining,
+        sleep_seconds=round(sleep_seconds),
+    )
+    time.sleep(sleep_seconds)
+
+
+def list_account_repos(
+    account: Account, command: str, options: TaskOptions
+) -> list[str]:
+    configure_tracing()
+
+    try:
+        with (
+            log.context(account=account.name),
+            span("list_repos", command=command, account=account.name),
+        ):
+            github = Github(account.token)
+            repo_names = [
+                repo.full_name
+                for repo in list_repos(command, github, options, account.orgs)
+            ]
+
+            log.info("listed repos", command=command, count=len(repo_names))
+            return repo_names
+    finally:
+        flush_spans()
+        flush_logs()
+
+
+def run_shard(
+    account: Account,
+    command: str,
+    repo_names: list[str],
+    options: TaskOptions,
+    deadline_at: float | None = None,
+) -> list[dict]:
+    """
+    Entrypoint of a worker process: run `command` for each repo in the shard, sequentially. Repos not started before
+    `deadline_at` (the command or run deadline of the parent) are reported as deferred.
+    """
+
+    results = []
+    configure_tracing()
+
+    try:
+        with (
+            log.context(account=account.name),
+            span("shard", command=command, account=account.name, repos=len(repo_names)),
+            deadline("command", expires_at=deadline_at),
+        ):
+            github = Github(account.token)
+            login = github.get_user().login
+
+            for index, repo_name in enumerate(repo_names):
+                if scope := expired_scope():
+                    log.warning(
+                        "deadline exceeded, deferring the rest of the shard",
+                        scope=scope,
+                        deferred=len(repo_names) - index,
+                    )
+                    results += [
+                        {
+                            "account": account.name,
+                            "command": command,
+                            "repo": deferred_repo,
+                            "ok": False,
+                            "error": f"{scope} deadline exceeded",
+                            "deferred": True,
+                        }
+                        for deferred_repo in repo_names[index:]
+                    ]
+                    break
+
+                wait_for_rate_limit(github)
+
+                result = run_repo_task(command, github, repo_name, options, login)
+                results.append(result | {"account": account.name})
+    finally:
+        flush_spans()
+        flush_logs()
+
+    return results
+
+
+def split_into_shards(repo_names: list[str], shard_count: int) -> list[list[str]]:
+    # round robin, so large repos which sort next to each other (forks, monorepo families) are spread out
+    shards = [repo_names[index::shard_count] for index in range(shard_count)]
+    return [shard for shard in shards if shard]
+
+
+def run_sharded(
+    accounts: list[Account],
+    command: str,
+    options: TaskOptions,
+    workers: int | None = None,
+) -> dict:
+    """
+    Returns a report with totals across all accounts, totals per account, and every per-repo result
+    """
+
+    workers = workers or os.cpu_count() or 1
+    results: list[dict] = []
+
+    # spawn instead of fork: forked children would inherit the log writer without its background thread
+    with ProcessPoolExecutor(
+        max_workers=workers, mp_context=multiprocessing.get_context("spawn")
+    ) as pool:
+        listings = {
+            account: pool.submit(list_account_repos, account, command, options)
+            for account in accounts
+        }
+
+        shard_futures = []
+
+        for account, listing in listings.items():
+            try:
+                repo_names = listing.result()
+            except Exception as e:  # pylint: disable=broad-except
+                log.error("failed to list repos", account=account.name, error=str(e))
+                results.append(
+                    {
+                        "account": account.name,
+                        "command": command,
+                        "repo": None,
+                        "ok": False,
+                        "error": f"{type(e).__name__}: {e}",
+                    }
+                )
+                continue
+
+            for shard in split_into_shards(repo_names, account.workers):
+                shard_futures.append(
+                    pool.submit(
+                        run_shard, account, command, shard, options, expires_at()
+                    )
+                )
+
+        log.info("submitted shards", accounts=len(accounts), shards=len(shard_futures))
+
+        for future in as_completed(shard_futures):
+            results.extend(future.result())
+
+    return build_report(results)
+
+
+def build_report(results: list[dict]) -> dict:
+    accounts = sorted({result["account"] for result in results})
+
+    return {
+        "total": summarize_results(results),
+        "accounts": {
+            account: summarize_results(
+                [result for result in results if result["account"] == account]
+            )
+            for account in accounts
+        },
+        "results": sorted(results, key=lambda r: (r["account"], r["repo"] or "")),
+    }
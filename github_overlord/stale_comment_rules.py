@@ -0,0 +1,91 @@
+"""
+Classify stale-bot comments locally before falling back to an LLM.
+
+Almost every stale-bot comment is one of a handful of templates (actions/stale, probot/stale and their common
+customizations), those are matched by the rules below and answered with a templated keep-alive reply.
+"""
+
+import re
+import typing as t
+
+from github.IssueComment import IssueComment
+
+
+class StaleRule(t.NamedTuple):
+    name: str
+    pattern: re.Pattern
+    # True: the PR will be closed without activity, False: nothing to keep alive
+    stale: bool
+
+
+def rule(name: str, pattern: str, stale: bool) -> StaleRule:
+    return StaleRule(name, re.compile(pattern, re.IGNORECASE), stale)
+
+
+# checked in order, the first match wins. Close notices come first: they repeat the stale wording but the PR is
+# already closed, a keep-alive comment would not reopen it
+RULES = [
+    # actions/stale close-pr-message: "This PR was closed because it has been stalled for 10 days with no activity."
+    rule(
+        "closed_after_stale",
+        r"\bwas (?:automatically )?closed because it has been (?:stalled|stale|inactive)",
+        False,
+    ),
+    # probot/stale closeComment and similar: "was closed due to inactivity", "has been automatically closed". Past tense
+    # only, "will be closed due to inactivity in 7 days" is a warning
+    rule(
+        "closed_inactive",
+        r"\b(?:(?:was|has been) (?:automatically )?closed due to (?:lack of (?:recent )?activity|inactivity)"
+        r"|has been automatically closed)\b",
+        False,
+    ),
+    # probot/stale unmarkComment
+    rule("unmarked_stale", r"\bis no longer (?:marked as )?stale\b", False),
+    # actions/stale stale-pr-message: "This PR is stale because it has been open 45 days with no activity."
+    rule(
+        "stale_open_days",
+        r"\bis stale because it has been open (?:for )?\d+ days? with no activity\b",
+        True,
+    ),
+    # probot/stale markComment: "This pull request has been automatically marked as stale because ..."
+    rule("marked_stale", r"\bhas been (?:automatically )?marked as stale\b", True),
+    # "Remove stale label or comment or this will be closed in 5 days."
+    rule("remove_stale_label", r"\bremove (?:the )?stale label or comment\b", True),
+    rule(
+        "closed_in_days",
+        r"\b(?:will|may) be (?:automatically )?closed "
+        r"(?:due to (?:lack of (?:recent )?activity|inactivity) )?(?:in|within|after) \d+ days?\b",
+        True,
+    ),
+    rule(
+        "closed_if_no_activity",
+        r"\bwill be (?:automatically )?closed if (?:no further|there is no|there's no) (?:further )?activity\b",
+        True,
+    ),
+]
+
+# replies are picked by comment id, so a PR gets a different wording each time the bot comments again
+KEEP_ALIVE_REPLIES = [
+    "Friendly reminder on this pull request! Let me know what else may need to be done here.",
+    "Friendly bump on this pull request! Let me know if anything else is needed to get this merged.",
+    "Just a friendly reminder on this pull request. Happy to make any changes that are needed!",
+    "Checking in on this pull request! Let me know if there is anything else I can do here.",
+]
+
+
+def classify(body: str) -> StaleRule | None:
+    """
+    Returns the first matching rule, None if the comment is not a known stale-bot wording
+    """
+
+    text = " ".join((body or "").split())
+
+    for candidate in RULES:
+        if candidate.pattern.search(text):
+            return candidate
+
+    return None
+
+
+def keep_alive_reply(comment: IssueComment) -> str:
+    return KEEP_ALIVE_REPLIES[comment.id % len(KEEP_ALIVE_REPLIES)]
@@ -5,25 +5,40 @@ from github import Github
 from github.IssueComment import IssueComment
 from github.PullRequest import PullRequest
 from github.Repository import Repository
-from openai import OpenAI
 
+from github_overlord import checkpoint, stale_comment_rules
+from github_overlord.deadlines import PR_DEADLINE_SECONDS, llm_timeout
+from github_overlord.pagination import prefetch_pages
+from github_overlord.tracing import span
 from github_overlord.utils import log
 
 
-def inspect_repo_for_stale_prs(dry_run: bool, login: str, repo: Repository):
+def inspect_repo_for_stale_prs(
+    dry_run: bool, login: str, repo: Repository
+) -> list[bool]:
     log.debug("inspecting repo for stale PRs", repo=repo.full_name)
 
-    return (
-        # there is not a way to filter by the user which created the PR! This take a long time on repos with many PRs
-        repo.get_pulls(state="open")
-        # make sure the auth token user is the author of the PR
-        | fp.filter(lambda pr: pr.user.login == login)
-        | fp.map(fp.partial(check_for_stale_comments, dry_run))
-        | fp.to_list()
-    )
+    def check_pr(pr: PullRequest) -> bool:
+        with (
+            span("pr", url=pr.html_url),
+            checkpoint.deferrable("pr", PR_DEADLINE_SECONDS, pr=pr.html_url),
+        ):
+            return check_for_stale_comments(dry_run, pr)
+
+        return False
+
+    with span("repo", command="keep-alive-prs", repo=repo.full_name):
+        return (
+            # there is not a way to filter by the user which created the PR! This take a long time on repos with many PRs
+            prefetch_pages(repo.get_pulls(state="open"))
+            # make sure the auth token user is the author of the PR
+            | fp.filter(lambda pr: pr.user.login == login)
+            | fp.map(check_pr)
+            | fp.to_list()
+        )
 
 
-def check_for_stale_comments(dry_run: bool, pr: PullRequest):
+def check_for_stale_comments(dry_run: bool, pr: PullRequest) -> bool:
     """
     Look at PRs which you have written:
 
@@ -31,6 +46,7 @@ def check_for_stale_comments(dry_run: bool, pr: PullRequest):
        the maintainer. This will keep the PR open by adding a comment.
     2. PRs that are not merged, been open for at least 30 days, with no comments from the maintainer.
 
+    Returns True if a keep-alive comment was made.
     """
 
     log.debug("checking for stale comments", url=pr.html_url)
@@ -40,20 +56,20 @@ def check_for_stale_comments(dry_run: bool, pr: PullRequest):
     comments = list(issue.get_comments())
 
     if len(comments) == 0:
-        return
+        return False
 
     last_comment = comments[-1]
 
     # TODO this will need to be changed
     if last_comment.user.login != "github-actions[bot]":
         log.debug("Last comment is not from github-actions[bot]", url=pr.html_url)
-        return
+        return False
 
     is_stale, comment = is_stale_comment(last_comment)
 
     if not is_stale:
         log.debug("comment does not indicate stale state", url=pr.html_url)
-        return
+        return False
 
     log.info(
         "comment indicates stale state, commenting", url=pr.html_url, comment=comment
@@ -61,13 +77,33 @@ def check_for_stale_comments(dry_run: bool, pr: PullRequest):
 
     if not dry_run:
         pr.create_issue_comment(comment)
+        checkpoint.record("pr_commented", pr=pr.html_url)
+
+    return True
 
 
 def is_stale_comment(comment: IssueComment):
     """
     Check if the comment indicates that the PR will be automatically closed if there is no activity
+
+    Known stale-bot wordings are classified locally, the LLM is only asked about comments no rule matches.
     """
 
+    if matched := stale_comment_rules.classify(comment.body):
+        log.debug(
+            "stale comment classified by rule", rule=matched.name, stale=matched.stale
+        )
+
+        if not matched.stale:
+            return (False, None)
+
+        return (True, stale_comment_rules.keep_alive_reply(comment))
+
+    log.debug("no stale comment rule matched, asking LLM", url=comment.html_url)
+
+    # only imported when a comment is not matched by any rule
+    from openai import OpenAI
+
     prompt = """
 A GitHub pull request comment will be included with the author name. Determine if this comment indicates that if there is no activity
 (more commits, comments, etc) the pull request will be closed. If the comment indicates that the pull
@@ -96,22 +132,23 @@ Author: {comment.user.login}
 
 {comment.body}
 """
-    client = OpenAI()
-
-    response = client.chat.completions.create(
-        messages=[
-            {
-                "role": "system",
-                "content": prompt,
-            },
-            {
-                "role": "user",
-                "content": comment_markdown,
-            },
-        ],
-        model="gpt-3.5-turbo",
-        response_format={"type": "json_object"},
-    )
+    client = OpenAI(timeout=llm_timeout())
+
+    with span("llm", model="gpt-3.5-turbo", purpose="stale_comment"):
+        response = client.chat.completions.create(
+            messages=[
+                {
+                    "role": "system",
+                    "content": prompt,
+                },
+                {
+                    "role": "user",
+                    "content": comment_markdown,
+                },
+            ],
+            model="gpt-3.5-turbo",
+            response_format={"type": "json_object"},
+        )
 
     # TODO got to be a helper for this instead
     message = response.choices[0].message
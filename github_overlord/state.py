@@ -0,0 +1,73 @@
+"""
+Local state which persists between runs (work queue, journals, caches). Kept separate from `config` so using it does
+not import jinja.
+"""
+
+import fcntl
+import json
+import os
+import typing as t
+from pathlib import Path
+
+from decouple import config
+
+from .utils import log
+
+STATE_DIRECTORY = Path(
+    config(
+        "GITHUB_OVERLORD_STATE_DIRECTORY",
+        default=str(Path.home() / ".local" / "state" / "github-overlord"),
+    )
+)
+
+
+def state_path(name: str) -> Path:
+    """
+    Path to a file in the state directory, creating the directory if needed
+    """
+
+    STATE_DIRECTORY.mkdir(parents=True, exist_ok=True)
+    return STATE_DIRECTORY / name
+
+
+def read_state(path: Path) -> dict[str, t.Any]:
+    """
+    Contents of a JSON state file, empty if it does not exist (yet) or is corrupt
+    """
+
+    if not path.exists():
+        return {}
+
+    try:
+        return json.loads(path.read_text(encoding="utf-8"))
+    except json.JSONDecodeError:
+        log.warning("state file is corrupt, ignoring", path=str(path))
+        return {}
+
+
+def update_state(
+    path: Path, merge: t.Callable[[dict[str, t.Any]], dict[str, t.Any]]
+) -> dict[str, t.Any]:
+    """
+    Replace a JSON state file with `merge(<current contents>)` and return what was written.
+
+    Multi-account shards and queue workers share state files: `merge` has to apply only the caller's own changes to
+    what is on disk. The read, merge and write happen under an exclusive lock, so concurrent updates are never lost,
+    and the file is replaced atomically, so readers which do not lock never see a partial write.
+    """
+
+    lock_path = path.with_name(f"{path.name}.lock")
+
+    with open(lock_path, "a", encoding="utf-8") as lock_file:
+        fcntl.flock(lock_file, fcntl.LOCK_EX)
+
+        try:
+            state = merge(read_state(path))
+
+            tmp_path = path.with_name(f"{path.name}.{os.getpid()}.tmp")
+            tmp_path.write_text(json.dumps(state, indent=2), encoding="utf-8")
+            os.replace(tmp_path, path)
+        finally:
+            fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+    return state
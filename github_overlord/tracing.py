@@ -0,0 +1,271 @@
+"""
+Lightweight spans for finding where a run spends its time: repos, PRs, GitHub API requests, LLM calls.
+
+Disabled unless `GITHUB_OVERLORD_TRACE` (or `--trace` on the cli group) is set:
+
+* `json`: one finished span per line in `GITHUB_OVERLORD_TRACE_PATH` (default `traces.jsonl` in the state directory)
+* `otlp`: batches are posted as OTLP/HTTP JSON to `OTEL_EXPORTER_OTLP_ENDPOINT` (default `http://localhost:4318`), any
+  OpenTelemetry collector, Jaeger or Tempo instance accepts them
+
+No OpenTelemetry SDK is needed, the wire format is simple enough to write directly.
+"""
+
+import atexit
+import contextvars
+import functools
+import json
+import os
+import secrets
+import threading
+import time
+import typing as t
+from contextlib import contextmanager
+from dataclasses import dataclass, field
+
+from decouple import config
+
+from .state import state_path
+from .utils import log
+
+SERVICE_NAME = "github-overlord"
+
+# buffered spans are exported once there are this many, and at exit
+EXPORT_BATCH_SIZE = 512
+
+
+@dataclass
+class Span:
+    name: str
+    trace_id: str
+    span_id: str
+    parent_span_id: str | None
+    attributes: dict[str, t.Any] = field(default_factory=dict)
+    start_ns: int = field(default_factory=time.time_ns)
+    end_ns: int | None = None
+    error: str | None = None
+
+    def set(self, **attributes) -> None:
+        self.attributes.update(attributes)
+
+    def to_dict(self) -> dict:
+        return {
+            "name": self.name,
+            "trace_id": self.trace_id,
+            "span_id": self.span_id,
+            "parent_span_id": self.parent_span_id,
+            "start_ns": self.start_ns,
+            "end_ns": self.end_ns,
+            "duration_ms": round(
+                ((self.end_ns or self.start_ns) - self.start_ns) / 1e6, 3
+            ),
+            "attributes": self.attributes,
+            "error": self.error,
+        }
+
+
+_current_span: contextvars.ContextVar[Span | None] = contextvars.ContextVar(
+    "current_span", default=None
+)
+
+
+class SpanExporter:
+    def __init__(self, exporter: str):
+        assert exporter in ("json", "otlp"), f"unknown trace exporter: {exporter}"
+
+        self.exporter = exporter
+        self._spans: list[Span] = []
+        self._lock = threading.Lock()
+
+    def add(self, span: Span) -> None:
+        with self._lock:
+            self._spans.append(span)
+
+            if len(self._spans) < EXPORT_BATCH_SIZE:
+                return
+
+            spans, self._spans = self._spans, []
+
+        self._export(spans)
+
+    def flush(self) -> None:
+        with self._lock:
+            spans, self._spans = self._spans, []
+
+        if spans:
+            self._export(spans)
+
+    def _export(self, spans: list[Span]) -> None:
+        try:
+            if self.exporter == "json":
+                self._export_json(spans)
+            else:
+                self._export_otlp(spans)
+        except Exception as e:  # pylint: disable=broad-except
+            # tracing must never break a run
+            log.warning("failed to export spans", exporter=self.exporter, error=str(e))
+
+    def _export_json(self, spans: list[Span]) -> None:
+        path = config("GITHUB_OVERLORD_TRACE_PATH", default=None) or state_path(
+            "traces.jsonl"
+        )
+
+        with open(path, "a", encoding="utf-8") as f:
+            for span in spans:
+                f.write(json.dumps(span.to_dict(), default=str) + "\n")
+
+    def _export_otlp(self, spans: list[Span]) -> None:
+        import urllib.request
+
+        endpoint = config(
+            "OTEL_EXPORTER_OTLP_ENDPOINT", default="http://localhost:4318"
+        ).rstrip("/")
+
+        request = urllib.request.Request(
+            f"{endpoint}/v1/traces",
+            data=json.dumps(otlp_payload(spans)).encode(),
+            headers={"Content-Type": "application/json"},
+            method="POST",
+        )
+
+        with urllib.request.urlopen(request, timeout=10):
+            pass
+
+
+def otlp_value(value) -> dict:
+    if isinstance(value, bool):
+        return {"boolValue": value}
+    if isinstance(value, int):
+        return {"intValue": str(value)}
+    if isinstance(value, float):
+        return {"doubleValue": value}
+    return {"stringValue": str(value)}
+
+
+def otlp_payload(spans: list[Span]) -> dict:
+    def otlp_span(span: Span) -> dict:
+        return {
+            "traceId": span.trace_id,
+            "spanId": span.span_id,
+            "parentSpanId": span.parent_span_id or "",
+            "name": span.name,
+            # internal
+            "kind": 1,
+            "startTimeUnixNano": str(span.start_ns),
+            "endTimeUnixNano": str(span.end_ns),
+            "attributes": [
+                {"key": key, "value": otlp_value(value)}
+                for key, value in span.attributes.items()
+                if value is not None
+            ],
+            # 1 = ok, 2 = error
+            "status": (
+                {"code": 2, "message": span.error} if span.error else {"code": 1}
+            ),
+        }
+
+    return {
+        "resourceSpans": [
+            {
+                "resource": {
+                    "attributes": [
+                        {"key": "service.name", "value": otlp_value(SERVICE_NAME)}
+                    ]
+                },
+                "scopeSpans": [
+                    {
+                        "scope": {"name": "github_overlord"},
+                        "spans": [otlp_span(span) for span in spans],
+                    }
+                ],
+            }
+        ]
+    }
+
+
+exporter: SpanExporter | None = None
+
+
+def configure_tracing(trace_exporter: str | None = None) -> None:
+    """
+    Enable tracing with the given exporter, defaults to `GITHUB_OVERLORD_TRACE`. Safe to call more than once.
+    """
+
+    global exporter
+
+    trace_exporter = trace_exporter or config("GITHUB_OVERLORD_TRACE", default=None)
+
+    if not trace_exporter or exporter is not None:
+        return
+
+    # spawned worker processes configure themselves from the environment
+    os.environ["GITHUB_OVERLORD_TRACE"] = trace_exporter
+
+    exporter = SpanExporter(trace_exporter)
+    instrument_requester()
+    atexit.register(exporter.flush)
+
+
+def flush_spans() -> None:
+    """
+    Export buffered spans. atexit does not run in multiprocessing children, call this before they exit.
+    """
+
+    if exporter:
+        exporter.flush()
+
+
+@contextmanager
+def span(name: str, **attributes) -> t.Iterator[Span | None]:
+    """
+    Time the block as a child of the current span. Yields None when tracing is disabled.
+    """
+
+    if exporter is None:
+        yield None
+        return
+
+    parent = _current_span.get()
+    current = Span(
+        name=name,
+        trace_id=parent.trace_id if parent else secrets.token_hex(16),
+        span_id=secrets.token_hex(8),
+        parent_span_id=parent.span_id if parent else None,
+        attributes=attributes,
+    )
+    token = _current_span.set(current)
+
+    try:
+        yield current
+    except BaseException as e:
+        current.error = f"{type(e).__name__}: {e}"
+        raise
+    finally:
+        _current_span.reset(token)
+        current.end_ns = time.time_ns()
+        exporter.add(current)
+
+
+def instrument_requester() -> None:
+    """
+    Wrap every GitHub API request in an `api` span
+    """
+
+    from github.Requester import Requester
+
+    if getattr(Requester.requestJsonAndCheck, "_traced", False):
+        return
+
+    original = Requester.requestJsonAndCheck
+
+    @functools.wraps(original)
+    def request_json_and_check(self, verb, url, *args, **kwargs):
+        with span("api", verb=verb, url=url.split("?", 1)[0]) as current:
+            headers, data = original(self, verb, url, *args, **kwargs)
+
+            if current:
+                current.set(rate_limit_remaining=headers.get("x-ratelimit-remaining"))
+
+            return headers, data
+
+    request_json_and_check._traced = True  # type: ignore
+    Requester.requestJsonAndCheck = request_json_and_check
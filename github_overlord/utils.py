@@ -3,21 +3,33 @@ This file should be imported first in any application entrypoint.
 """
 
 import logging
+import re
+import sys
 import typing as t
 from pathlib import Path
 
 import structlog
 from decouple import config
 
+from .log_sink import (
+    BatchedLogWriter,
+    QueuedLoggerFactory,
+    build_renderer,
+    queued_processors,
+)
+
 root: Path
 
 # must type manually, unfortunately :/
 # https://www.structlog.org/en/21.3.0/types.html
 log: structlog.stdlib.BoundLogger
 
+# set when logs are written from a background thread
+log_writer: BatchedLogWriter | None = None
+
 
 def configure_logger():
-    global log
+    global log, log_writer
 
     # context manager to auto-clear context
     log.context = structlog.contextvars.bound_contextvars  # type: ignore
@@ -26,14 +38,13 @@ def configure_logger():
     # clear thread-local context
     log.clear = structlog.contextvars.clear_contextvars  # type: ignore
 
-    logger_factory = structlog.PrintLoggerFactory()
+    log_file = sys.stdout
 
     # allow user to specify a log in case they want to do something meaningful with the stdout
     if python_log_path := config("PYTHON_LOG_PATH", default=None):
-        python_log = open(
+        log_file = open(
             python_log_path, "a", encoding="utf-8"
         )  # pylint: disable=consider-using-with
-        logger_factory = structlog.PrintLoggerFactory(file=python_log)
 
     log_level = t.cast(str, config("LOG_LEVEL", default="INFO", cast=str))
     level = getattr(logging, log_level.upper())
@@ -45,14 +56,87 @@ def configure_logger():
     # TODO look into further customized format
     # https://cs.github.com/GeoscienceAustralia/digitalearthau/blob/4cf486eb2a93d7de23f86ce6de0c3af549fe42a9/digitalearthau/uiutil.py#L45
 
+    # "console" or "json" (JSON lines, one event per line)
+    log_format = t.cast(str, config("LOG_FORMAT", default="console", cast=str))
+
+    # writing synchronously blocks the caller on every log call, only disable when debugging the logger itself
+    if config("LOG_QUEUE", default=True, cast=bool):
+        log_writer = BatchedLogWriter(
+            log_file,
+            build_renderer(log_format, log_file),
+            batch_size=config("LOG_QUEUE_BATCH_SIZE", default=256, cast=int),
+            flush_interval=config("LOG_QUEUE_FLUSH_INTERVAL", default=0.5, cast=float),
+        )
+
+        # keep 1 out of every N of the noisy per-repo/per-PR debug events. `|` separated, event names contain commas
+        sampled_events = t.cast(
+            str,
+            config(
+                "LOG_SAMPLED_EVENTS",
+                default="skipping PR|PR is not from dependabot",
+                cast=str,
+            ),
+        )
+
+        structlog.configure(
+            processors=queued_processors(
+                sample_rate=config("LOG_DEBUG_SAMPLE_RATE", default=1, cast=int),
+                sampled_events=[
+                    event.strip() for event in sampled_events.split("|") if event
+                ],
+            ),
+            context_class=dict,
+            wrapper_class=structlog.make_filtering_bound_logger(level),
+            logger_factory=QueuedLoggerFactory(log_writer),
+            cache_logger_on_first_use=True,
+        )
+
+        return
+
+    # the default renderer decides on colors by looking at stdout, not at the log file
+    processors = structlog.get_config()["processors"][:-1]
+
+    if log_format == "json":
+        processors.append(structlog.processors.format_exc_info)
+
+    processors.append(build_renderer(log_format, log_file))
+
     structlog.configure(
+        processors=processors,
         context_class=dict,
         wrapper_class=structlog.make_filtering_bound_logger(level),
-        logger_factory=logger_factory,
+        logger_factory=structlog.PrintLoggerFactory(file=log_file),
         cache_logger_on_first_use=True,
     )
 
 
+def extract_repo_reference_from_github_url(url: str | None):
+    """
+    Extract the owner and repo from a GitHub URL
+    """
+
+    if url is None:
+        return None
+
+    # convert 'https://github.com/iloveitaly/todoist-digest/pulls' to 'iloveitaly/todoist-digest'
+    if "github.com" in url:
+        match = re.search(r"github\.com/([^/]+)/([^/]+)", url)
+
+        if match:
+            url = f"{match.group(1)}/{match.group(2)}"
+
+    return url
+
+
+def flush_logs():
+    """
+    Processes started by multiprocessing exit without running atexit handlers, call this before returning from them
+    """
+
+    if log_writer:
+        log_writer.flush()
+
+
 def setup():
     if hasattr(setup, "complete") and setup.complete:
         return
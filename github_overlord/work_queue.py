@@ -0,0 +1,289 @@
+"""
+Durable queue of repo tasks (one per command + account + repo). Workers claim tasks with a lease, failures are retried
+with exponential backoff, and the outcome of every task is recorded.
+
+`WorkQueue` is the interface, `SQLiteWorkQueue` the local implementation. Any process which can open the same
+database file (e.g. containers sharing a volume) can drain the queue.
+"""
+
+import json
+import random
+import sqlite3
+import time
+import typing as t
+from dataclasses import dataclass
+from pathlib import Path
+
+from .state import STATE_DIRECTORY
+
+DEFAULT_QUEUE_URL = f"sqlite:///{STATE_DIRECTORY / 'queue.sqlite3'}"
+
+BACKOFF_BASE_SECONDS = 30
+BACKOFF_MAX_SECONDS = 60 * 60
+
+
+@dataclass
+class Task:
+    id: int
+    command: str
+    account: str
+    repo: str
+    options: dict
+    attempts: int
+    max_attempts: int
+
+
+class WorkQueue(t.Protocol):
+    def enqueue(
+        self,
+        command: str,
+        account: str,
+        repos: t.Iterable[str],
+        options: dict,
+        max_attempts: int = 3,
+    ) -> int: ...
+
+    def claim(self, worker_id: str, lease_seconds: float) -> Task | None: ...
+
+    def extend_lease(
+        self, task_id: int, worker_id: str, lease_seconds: float
+    ) -> bool: ...
+
+    def complete(self, task_id: int, worker_id: str, result: dict) -> None: ...
+
+    def fail(self, task_id: int, worker_id: str, error: str) -> None: ...
+
+    def stats(self) -> dict[str, int]: ...
+
+    def failed_tasks(self) -> list[dict]: ...
+
+
+def backoff_seconds(attempts: int) -> float:
+    delay = min(BACKOFF_BASE_SECONDS * 2 ** (attempts - 1), BACKOFF_MAX_SECONDS)
+    # jitter so tasks which failed together (e.g. a rate limit) do not retry together
+    return delay * random.uniform(0.5, 1.5)
+
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS tasks (
+    id INTEGER PRIMARY KEY,
+    command TEXT NOT NULL,
+    account TEXT NOT NULL,
+    repo TEXT NOT NULL,
+    options TEXT NOT NULL,
+    -- pending, running, done, failed
+    status TEXT NOT NULL DEFAULT 'pending',
+    attempts INTEGER NOT NULL DEFAULT 0,
+    max_attempts INTEGER NOT NULL,
+    available_at REAL NOT NULL,
+    lease_owner TEXT,
+    lease_expires_at REAL,
+    result TEXT,
+    last_error TEXT,
+    updated_at REAL NOT NULL,
+    UNIQUE (command, account, repo)
+);
+CREATE INDEX IF NOT EXISTS tasks_claimable ON tasks (status, available_at);
+"""
+
+
+class SQLiteWorkQueue:
+    """
+    Every method is a single short transaction, `BEGIN IMMEDIATE` serializes claims across processes
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        Path(path).parent.mkdir(parents=True, exist_ok=True)
+
+        self.connection = sqlite3.connect(path, timeout=30, isolation_level=None)
+        self.connection.row_factory = sqlite3.Row
+        self.connection.execute("PRAGMA journal_mode=WAL")
+        self.connection.executescript(SCHEMA)
+
+    def enqueue(
+        self,
+        command: str,
+        account: str,
+        repos: t.Iterable[str],
+        options: dict,
+        max_attempts: int = 3,
+    ) -> int:
+        """
+        Add a task per repo. A task which already finished is reset to pending, a pending or running one is left alone.
+        """
+
+        now = time.time()
+        rows = [
+            (command, account, repo, json.dumps(options), max_attempts, now, now)
+            for repo in repos
+        ]
+
+        with self._transaction():
+            before = self.connection.total_changes
+            self.connection.executemany(
+                """
+                INSERT INTO tasks (command, account, repo, options, max_attempts, available_at, updated_at)
+                VALUES (?, ?, ?, ?, ?, ?, ?)
+                ON CONFLICT (command, account, repo) DO UPDATE SET
+                    options = excluded.options,
+                    status = 'pending',
+                    attempts = 0,
+                    max_attempts = excluded.max_attempts,
+                    available_at = excluded.available_at,
+                    lease_owner = NULL,
+                    lease_expires_at = NULL,
+                    last_error = NULL,
+                    updated_at = excluded.updated_at
+                WHERE tasks.status IN ('done', 'failed')
+                """,
+                rows,
+            )
+            return self.connection.total_changes - before
+
+    def claim(self, worker_id: str, lease_seconds: float) -> Task | None:
+        """
+        Claim the next available task, including tasks whose lease expired because their worker died
+        """
+
+        now = time.time()
+
+        with self._transaction():
+            # a worker which keeps dying on the same task (OOM, killed container) must not retry it forever
+            self.connection.execute(
+                """
+                UPDATE tasks
+                SET status = 'failed', last_error = 'lease expired', lease_owner = NULL, updated_at = ?
+                WHERE status = 'running' AND lease_expires_at < ? AND attempts >= max_attempts
+                """,
+                (now, now),
+            )
+
+            row = self.connection.execute(
+                """
+                SELECT * FROM tasks
+                WHERE (status = 'pending' AND available_at <= ?)
+                   OR (status = 'running' AND lease_expires_at < ?)
+                ORDER BY available_at
+                LIMIT 1
+                """,
+                (now, now),
+            ).fetchone()
+
+            if row is None:
+                return None
+
+            self.connection.execute(
+                """
+                UPDATE tasks
+                SET status = 'running', attempts = attempts + 1, lease_owner = ?, lease_expires_at = ?, updated_at = ?
+                WHERE id = ?
+                """,
+                (worker_id, now + lease_seconds, now, row["id"]),
+            )
+
+        return Task(
+            id=row["id"],
+            command=row["command"],
+            account=row["account"],
+            repo=row["repo"],
+            options=json.loads(row["options"]),
+            attempts=row["attempts"] + 1,
+            max_attempts=row["max_attempts"],
+        )
+
+    def extend_lease(self, task_id: int, worker_id: str, lease_seconds: float) -> bool:
+        """
+        Returns False if the lease was lost (expired and claimed by another worker)
+        """
+
+        now = time.time()
+
+        with self._transaction():
+            cursor = self.connection.execute(
+                """
+                UPDATE tasks SET lease_expires_at = ?, updated_at = ?
+                WHERE id = ? AND status = 'running' AND lease_owner = ?
+                """,
+                (now + lease_seconds, now, task_id, worker_id),
+            )
+            return cursor.rowcount == 1
+
+    def complete(self, task_id: int, worker_id: str, result: dict) -> None:
+        with self._transaction():
+            self.connection.execute(
+                """
+                UPDATE tasks
+                SET status = 'done', result = ?, last_error = NULL, lease_owner = NULL, lease_expires_at = NULL,
+                    updated_at = ?
+                WHERE id = ? AND lease_owner = ?
+                """,
+                (json.dumps(result), time.time(), task_id, worker_id),
+            )
+
+    def fail(self, task_id: int, worker_id: str, error: str) -> None:
+        now = time.time()
+
+        with self._transaction():
+            row = self.connection.execute(
+                "SELECT attempts, max_attempts FROM tasks WHERE id = ? AND lease_owner = ?",
+                (task_id, worker_id),
+            ).fetchone()
+
+            if row is None:
+                return
+
+            exhausted = row["attempts"] >= row["max_attempts"]
+
+            self.connection.execute(
+                """
+                UPDATE tasks
+                SET status = ?, available_at = ?, last_error = ?, lease_owner = NULL, lease_expires_at = NULL,
+                    updated_at = ?
+                WHERE id = ?
+                """,
+                (
+                    "failed" if exhausted else "pending",
+                    now if exhausted else now + backoff_seconds(row["attempts"]),
+                    error,
+                    now,
+                    task_id,
+                ),
+            )
+
+    def stats(self) -> dict[str, int]:
+        rows = self.connection.execute(
+            "SELECT status, COUNT(*) AS count FROM tasks GROUP BY status"
+        ).fetchall()
+        return {row["status"]: row["count"] for row in rows}
+
+    def failed_tasks(self) -> list[dict]:
+        rows = self.connection.execute(
+            "SELECT command, account, repo, attempts, last_error FROM tasks WHERE status = 'failed' ORDER BY id"
+        ).fetchall()
+        return [dict(row) for row in rows]
+
+    def _transaction(self):
+        return _ImmediateTransaction(self.connection)
+
+
+class _ImmediateTransaction:
+    def __init__(self, connection: sqlite3.Connection):
+        self.connection = connection
+
+    def __enter__(self):
+        self.connection.execute("BEGIN IMMEDIATE")
+
+    def __exit__(self, exc_type, exc, tb):
+        self.connection.execute("ROLLBACK" if exc_type else "COMMIT")
+
+
+def open_work_queue(url: str = DEFAULT_QUEUE_URL) -> WorkQueue:
+    """
+    `sqlite:///absolute/path.sqlite3` is the only backend right now, other schemes are the extension point
+    """
+
+    if url.startswith("sqlite:///"):
+        return SQLiteWorkQueue(url.removeprefix("sqlite:///"))
+
+    raise ValueError(f"unsupported work queue url: {url}")
@@ -1,9 +1,20 @@
 import os
 
+import click
 from apscheduler.schedulers.background import BlockingScheduler
 from apscheduler.triggers.cron import CronTrigger
 
 from github_overlord import cli
+from github_overlord.accounts import load_accounts
+from github_overlord.deadlines import (
+    COMMAND_DEADLINE_SECONDS,
+    RUN_DEADLINE_SECONDS,
+    DeadlineExceeded,
+    check_deadline,
+    deadline,
+)
+from github_overlord.repo_tasks import REPO_COMMANDS
+from github_overlord.tracing import configure_tracing, flush_spans, span
 from github_overlord.utils import log
 
 
@@ -18,10 +29,111 @@ def handle_click_exit(func):
     return wrapper
 
 
+# in this order: check-releases needs an LLM key and a topic, a missing one must not hold up the other commands
+SCHEDULED_COMMANDS = ("dependabot", "keep-alive-prs", "notifications", "check-releases")
+
+
+def multi_account_job(accounts_file):
+    ctx = click.Context(cli)
+    multi_account = cli.get_command(ctx, "multi-account")
+    assert multi_account
+
+    for command_name in REPO_COMMANDS:
+        if command_name == "check-releases" and not os.environ.get(
+            "RELEASE_CHECKER_TOPIC"
+        ):
+            continue
+
+        check_deadline()
+
+        log.info("running command for all accounts", command=command_name)
+
+        try:
+            with (
+                span("command", command="multi-account", repo_command=command_name),
+                deadline("command", COMMAND_DEADLINE_SECONDS),
+            ):
+                handle_click_exit(multi_account)(
+                    [command_name, "--accounts-file", accounts_file]
+                )
+        except DeadlineExceeded as e:
+            if e.scope != "command":
+                raise
+
+            log.warning("command deadline exceeded", command=command_name)
+        except (Exception, SystemExit):  # pylint: disable=broad-except
+            log.exception("command failed", command=command_name)
+
+    # notifications are per user, not per repo: run once for each account's token
+    notifications = cli.get_command(ctx, "notifications")
+    assert notifications
+
+    for account in load_accounts(accounts_file):
+        check_deadline()
+
+        log.info("running command", command="notifications", account=account.name)
+
+        try:
+            with (
+                log.context(account=account.name),
+                span("command", command="notifications", account=account.name),
+                deadline("command", COMMAND_DEADLINE_SECONDS),
+            ):
+                handle_click_exit(notifications)(["--token", account.token])
+        except DeadlineExceeded as e:
+            if e.scope != "command":
+                raise
+
+            log.warning("command deadline exceeded", command="notifications")
+        except (Exception, SystemExit):  # pylint: disable=broad-except
+            log.exception("command failed", command="notifications")
+
+
 def job():
-    for command in list(cli.commands.values()):
+    # commands are invoked directly, the cli group which sets up tracing is skipped
+    configure_tracing()
+
+    try:
+        with deadline("run", RUN_DEADLINE_SECONDS):
+            run_commands()
+    except DeadlineExceeded as e:
+        # commands with a run journal record what was left, the next run resumes it
+        log.warning("deadline exceeded, skipping the remaining commands", scope=e.scope)
+    finally:
+        flush_spans()
+
+
+def run_commands():
+    # one container for several accounts, instead of a container per GITHUB_TOKEN
+    if accounts_file := os.environ.get("GITHUB_OVERLORD_ACCOUNTS_FILE"):
+        multi_account_job(accounts_file)
+        return
+
+    ctx = click.Context(cli)
+
+    for command_name in SCHEDULED_COMMANDS:
+        command = cli.get_command(ctx, command_name)
+        assert command
+
+        # raises once the run deadline passed, no point starting another command
+        check_deadline()
+
         log.info("running command", command=command.name)
-        handle_click_exit(command)()
+
+        try:
+            with (
+                span("command", command=command_name),
+                deadline("command", COMMAND_DEADLINE_SECONDS),
+            ):
+                handle_click_exit(command)()
+        except DeadlineExceeded as e:
+            if e.scope != "command":
+                raise
+
+            log.warning("command deadline exceeded", command=command_name)
+        except (Exception, SystemExit):  # pylint: disable=broad-except
+            # one misconfigured or broken command should not stop the others
+            log.exception("command failed", command=command_name)
 
 
 def cron():